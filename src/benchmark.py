@@ -0,0 +1,275 @@
+""" Benchmark of game of life engines over bundled RLE patterns
+    and random soups. Results are written as JSON, so that they can be
+    compared between commits (see --baseline).
+
+    Example:
+        python src/benchmark.py -n 100 -o bench.json
+        python src/benchmark.py -n 100 --baseline bench.json
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from game_of_life import (
+    ENGINES, parse_rle_array, parse_rle_rule, write_rle,
+)
+from game_of_life.instance_buffer import InstanceBuffer
+from game_of_life.batch import BatchCells
+from headless import run
+
+PATTERNS = (
+    "tests/p18_glider_shuttle.rle",
+    "tests/sir_robin.rle",
+    "tests/fireship.rle",
+    "tests/58p8h4v0.rle",
+)
+SOUP_SIZES = (32, 64, 128, 256)
+
+# Peak memory is traced over separate short run, since tracing slows
+# Python code down and would spoil timings.
+MEMORY_GENERATIONS = 8
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """ Parse command line arguments. """
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark game of life engines."
+    )
+    parser.add_argument(
+        "-n", "--generations", type=int, default=100,
+        help="count of generations per run (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-e", "--engines", nargs="+", choices=ENGINES, default=list(ENGINES),
+        help="engines to benchmark (default: all)",
+    )
+    parser.add_argument(
+        "-s", "--soups", nargs="*", type=int, default=list(SOUP_SIZES),
+        help="sides of random soups (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="seed of random soups",
+    )
+    parser.add_argument(
+        "-b", "--batch", type=int, default=256,
+        help="count of soups run to stabilization by batch engine, "
+             "0 to skip it (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--universes", type=int, default=256,
+        help="count of universes stepped together by batch engine "
+             "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "-o", "--output", default=None,
+        help="path to write JSON results, stdout by default",
+    )
+    parser.add_argument(
+        "--baseline", default=None,
+        help="JSON results to compare speed with",
+    )
+
+    return parser.parse_args(argv)
+
+
+def soup(side: int, rng: np.random.Generator) -> np.ndarray:
+    """ Square of cells with half of them alive. """
+
+    ys, xs = np.nonzero(rng.random((side, side)) < 0.5)
+    return np.stack((xs, -ys), axis=1)
+
+
+def git_commit() -> str:
+    """ Commit of working tree or empty string if it's unknown. """
+
+    try:
+        return subprocess.run(
+            ("git", "rev-parse", "--short", "HEAD"),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def bench_engine(engine_type, cells: np.ndarray, rule, generations: int):
+    """ Measure single engine over given initial cells. Update of
+        renderer's instance buffer is measured between the last two
+        generations, the way it's done for every rendered snapshot.
+    """
+
+    start = time.perf_counter()
+    engine = engine_type(cells, rule)
+    init_time = time.perf_counter() - start
+
+    buffer = InstanceBuffer()
+    start = time.perf_counter()
+    run(engine, max(generations - 1, 0))
+    buffer.update(engine.live_cells())
+    run(engine, min(generations, 1))
+    step_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    buffer.update(engine.live_cells())
+    instance_time = time.perf_counter() - start
+
+    result = {
+        "init_time": init_time,
+        "step_time": step_time,
+        "gens_per_sec": generations / step_time if step_time else None,
+        "instance_update_time": instance_time,
+        "population": engine.population,
+    }
+    close = getattr(engine, "close", None)
+    if close is not None:
+        close()
+
+    tracemalloc.start()
+    engine = engine_type(cells, rule)
+    run(engine, min(generations, MEMORY_GENERATIONS))
+    result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    close = getattr(engine, "close", None)
+    if close is not None:
+        close()
+
+    return result
+
+
+def bench_batch(soups: int, universes: int, seed: int) -> dict:
+    """ Measure throughput of batch engine over 16x16 soups. Speed per
+        core is measured by CPU time of process.
+    """
+
+    batch = BatchCells(universes, seed=seed)
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    results = list(batch.run(soups))
+    elapsed = time.perf_counter() - start
+    cpu_time = time.process_time() - cpu_start
+
+    return {
+        "universes": universes,
+        "soups": len(results),
+        "elapsed": elapsed,
+        "soups_per_sec": len(results) / elapsed,
+        "soups_per_core_sec": len(results) / cpu_time,
+        "unstabilized": sum(result.period is None for result in results),
+    }
+
+
+def bench_pattern(name: str, path: str, engines, generations: int) -> dict:
+    """ Measure parsing of pattern and all engines over it. """
+
+    start = time.perf_counter()
+    cells = parse_rle_array(path)
+    parse_time = time.perf_counter() - start
+    rule = parse_rle_rule(path)
+
+    results = {
+        engine: bench_engine(ENGINES[engine], cells, rule, generations)
+        for engine in engines
+    }
+    populations = {result["population"] for result in results.values()}
+
+    return {
+        "pattern": name,
+        "cells": len(cells),
+        "parse_time": parse_time,
+        "populations_match": len(populations) <= 1,
+        "engines": results,
+    }
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """ Print speed of results relative to baseline. """
+
+    old = {
+        (pattern["pattern"], engine): result["gens_per_sec"]
+        for pattern in baseline["patterns"]
+        for engine, result in pattern["engines"].items()
+    }
+
+    print(f"compared with {baseline.get('commit') or 'baseline'}:",
+          file=sys.stderr)
+    if "batch" in results and "batch" in baseline:
+        after = results["batch"]["soups_per_core_sec"]
+        before = baseline["batch"]["soups_per_core_sec"]
+        print(f"  {'batch soups':35} {after / before:6.2f}x", file=sys.stderr)
+    for pattern in results["patterns"]:
+        for engine, result in pattern["engines"].items():
+            before = old.get((pattern["pattern"], engine))
+            after = result["gens_per_sec"]
+            if before and after:
+                print(f"  {pattern['pattern']:24} {engine:10} "
+                      f"{after / before:6.2f}x", file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    """ Entry point of benchmark. Returns 1 if engines disagree. """
+
+    args = parse_args(argv)
+    rng = np.random.default_rng(args.seed)
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "generations": args.generations,
+        "patterns": [],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = [(pathlib.Path(path).stem, path) for path in PATTERNS]
+        # Soups are parsed from RLE as well, to measure parsing of them.
+        for side in args.soups:
+            path = os.path.join(tmp, f"soup_{side}.rle")
+            write_rle(path, soup(side, rng))
+            sources.append((f"soup_{side}", path))
+
+        for name, path in sources:
+            print(f"{name}...", file=sys.stderr)
+            results["patterns"].append(
+                bench_pattern(name, path, args.engines, args.generations)
+            )
+
+    if args.batch:
+        print("batch...", file=sys.stderr)
+        results["batch"] = bench_batch(args.batch, args.universes, args.seed)
+
+    output = json.dumps(results, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, "w", encoding="utf8") as file:
+            file.write(output + "\n")
+
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf8") as file:
+            compare(results, json.load(file))
+
+    mismatches = [
+        pattern["pattern"] for pattern in results["patterns"]
+        if not pattern["populations_match"]
+    ]
+    if mismatches:
+        print(f"populations differ between engines: {', '.join(mismatches)}",
+              file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,44 @@
 """ Module that contains abilities to run game of life cellar automata. """
 
+import importlib
+
 from .cells import Cells
-from .renderer import Renderer
-from .game_of_life import GameOfLife
-from .rle_parser import parse_rle
+from .rle_parser import (
+    parse_rle, parse_rle_array, parse_rle_rule, write_rle,
+)
+from .hashlife import HashLife
+from .dense import DenseCells
+from .bitpacked import BitPackedCells
+from .tiled import TiledCells
+from .parallel import ParallelCells
+from .mapped import MappedCells
+from .packed_state import PackedState
+from .spatial_index import SpatialIndex
+from .snapshot import Snapshot, SnapshotBuffer
+from .cycles import Cycle, CycleDetector, fast_forward
+from .history import History
+from .checkpoint import Checkpoint, load_checkpoint, save_checkpoint
+from .sparse import SparseCells
+from .batch import BatchCells, SoupResult
+from .census import Census, CensusObject, components, canonical_form
+from .export import Rasterizer, Exporter, open_writer, write_png
+from .rules import Rule, CONWAY
+from .engine import (
+    Engine, EnginePolicy, ENGINES, register_engine, create_engine,
+    create_like, convert_engine,
+)
+
+# Renderer and GameOfLife require OpenGL, so they are imported
+# on first access only, and engines can be used without it.
+_LAZY = {
+    "Renderer": ".renderer",
+    "GameOfLife": ".game_of_life",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        module = importlib.import_module(_LAZY[name], __name__)
+        return getattr(module, name)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,201 @@
+""" Batch engine, which steps many independent random soups at once,
+    e.g. for census-style searches.
+"""
+
+from typing import Iterator, NamedTuple, Optional
+
+import numpy as np
+
+from .rules import Rule, CONWAY
+from .dense import neighbors_count
+
+
+class SoupResult(NamedTuple):
+    """ Soup that stabilized or ran out of generations, and its cells
+        at given generation. Soup can be recreated by
+        BatchCells.soup(number).
+    """
+
+    number: int
+    generations: int
+    # None if soup didn't stabilize within maximum of generations.
+    period: Optional[int]
+    cells: np.ndarray
+
+
+class BatchCells:
+    """ Stack of fixed-size universes, each of them seeded with random
+        soup in its center. All universes are stepped together by one
+        vectorized step. Cells beyond border of universe are dead.
+
+        Universe is stabilized once its state repeats with period
+        not greater than max_period. States are compared by 64-bit
+        hashes, so that only hashes of the last generations are kept.
+    """
+
+    def __init__(
+        self, count: int, side: int = 16, size: int = 64,
+        rule: Rule = CONWAY, density: float = 0.5, seed: int = 0,
+        max_period: int = 6, max_generations: int = 10_000,
+    ):
+        """ count: count of universes stepped together.
+            side: side of square soup.
+            size: side of universe, multiple of 8.
+            density: probability of soup cell to be alive.
+            seed: seed soups are generated from.
+        """
+
+        if size % 8:
+            raise ValueError("Size of universe must be multiple of 8.")
+        if not 0 < side <= size:
+            raise ValueError("Soup must fit in universe.")
+
+        self.rule = rule
+        self.side = side
+        self.size = size
+        self.density = density
+        self.seed = seed
+        self.max_period = max_period
+        self.max_generations = max_generations
+
+        # Stack of universes with outline of dead cells.
+        self._grid = np.zeros((count, size + 2, size + 2), np.uint8)
+        self.generations = np.zeros(count, np.int64)
+        self.numbers = np.zeros(count, np.int64)
+        # Period of stabilized universe or 0.
+        self.periods = np.zeros(count, np.int64)
+
+        # Column k is hash of state k + 1 generations ago.
+        self._hashes = np.zeros((count, max_period), np.uint64)
+        self._weights = np.random.default_rng(seed).integers(
+            0, 1 << 63, size * size // 64, np.uint64,
+        ) * np.uint64(2) + np.uint64(1)
+
+        self._next_number = 0
+        # Results retired beyond count requested by run, which are
+        # yielded first by next run.
+        self._pending: list[SoupResult] = []
+        self.__seed(np.arange(count))
+
+    def __len__(self) -> int:
+        return len(self._grid)
+
+    @property
+    def population(self) -> np.ndarray:
+        """ Count of alive cells of every universe. """
+        return np.count_nonzero(self._grid, axis=(1, 2))
+
+    @property
+    def finished(self) -> np.ndarray:
+        """ Mask of universes that stabilized or ran out of generations. """
+        return (self.periods > 0) | (self.generations >= self.max_generations)
+
+    def soup(self, number: int) -> np.ndarray:
+        """ Soup with given number as (side, side) array of states. """
+
+        rng = np.random.default_rng((self.seed, number))
+        return (rng.random((self.side, self.side)) < self.density) \
+            .astype(np.uint8)
+
+    def live_cells(self, index: int) -> np.ndarray:
+        """ Return (N, 2) array of alive cells of universe with index. """
+
+        ys, xs = np.nonzero(self._grid[index, 1:-1, 1:-1])
+        return np.stack((xs, ys), axis=1)
+
+    def step(self, n: int = 1) -> None:
+        """ Do next n iterations of all universes. """
+
+        for _ in range(n):
+            self.__step()
+
+    def __step(self) -> None:
+        grid = self._grid
+        inner = grid[:, 1:-1, 1:-1]
+        counts = neighbors_count(grid)
+
+        # Comparisons with few counts of rule are several times faster
+        # than Rule.lookup over such big arrays.
+        born = np.zeros(counts.shape, bool)
+        for count in self.rule.births:
+            born |= counts == count
+        survived = np.zeros(counts.shape, bool)
+        for count in self.rule.survivals:
+            survived |= counts == count
+        survived &= inner.view(bool)
+        born |= survived
+        inner[...] = born
+
+        self.generations += 1
+        active = self.periods == 0
+
+        hashes = self.__hash(self._grid)
+        seen = np.minimum(self.generations, self.max_period)
+        # Stabilized universes are stepped as well, since it's cheaper
+        # than to separate them, but they aren't checked anymore.
+        matches = (self._hashes == hashes[:, None]) \
+            & (np.arange(self.max_period) < seen[:, None])
+        stabilized = active & matches.any(axis=1)
+        self.periods[stabilized] = matches[stabilized].argmax(axis=1) + 1
+
+        self._hashes[:, 1:] = self._hashes[:, :-1]
+        self._hashes[:, 0] = hashes
+
+    def __hash(self, grid: np.ndarray) -> np.ndarray:
+        """ Hash of every universe of stack, i.e. weighted sum of its
+            64-bit words (modulo 2^64).
+        """
+
+        bits = np.packbits(grid[:, 1:-1, 1:-1], axis=-1)
+        words = np.ascontiguousarray(bits) \
+            .reshape(len(bits), self.size * self.size // 8).view(np.uint64)
+        return (words * self._weights).sum(axis=1, dtype=np.uint64)
+
+    def __seed(self, indices: np.ndarray) -> None:
+        """ Put new soups into universes with given indices. """
+
+        start = (self.size - self.side) // 2 + 1
+        inner = slice(start, start + self.side)
+
+        self._grid[indices] = 0
+        for index in indices:
+            self._grid[index, inner, inner] = self.soup(self._next_number)
+            self.numbers[index] = self._next_number
+            self._next_number += 1
+
+        self.generations[indices] = 0
+        self.periods[indices] = 0
+        self._hashes[indices] = 0
+        self._hashes[indices, 0] = self.__hash(self._grid[indices])
+
+    def retire(self) -> list[SoupResult]:
+        """ Replace finished universes with new soups. Returns results
+            of finished ones.
+        """
+
+        indices = np.flatnonzero(self.finished)
+        results = [
+            SoupResult(
+                int(self.numbers[index]), int(self.generations[index]),
+                int(self.periods[index]) or None, self.live_cells(index),
+            )
+            for index in indices
+        ]
+        self.__seed(indices)
+        return results
+
+    def run(self, soups: int, check_every: int = 8) -> Iterator[SoupResult]:
+        """ Step universes until given count of soups is finished
+            and yield their results. Finished universes are retired
+            every check_every generations. Results retired beyond
+            the count are kept for the next call.
+        """
+
+        done = 0
+        while done < soups:
+            while not self._pending:
+                self.step(check_every)
+                self._pending = self.retire()
+
+            done += 1
+            yield self._pending.pop(0)
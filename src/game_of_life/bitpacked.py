@@ -0,0 +1,282 @@
+""" Bit-packed game of life engine, where every row of cells is packed
+    into uint64 words and next generation is computed with bitwise logic.
+"""
+
+from typing import Optional, Iterable
+
+import numpy as np
+
+from module_typing import GameState, Pos
+from .rules import Rule, CONWAY
+from .packed_state import cells_to_array, pack
+
+WORD_BITS = 64
+
+_ONE = np.uint64(1)
+_LAST = np.uint64(WORD_BITS - 1)
+
+# Count of set bits for every byte value.
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], np.uint8)
+
+
+def _full_add(a: np.ndarray, b: np.ndarray, c: np.ndarray):
+    """ Bitwise full adder, returns sum and carry. """
+    t = a ^ b
+    return t ^ c, (a & b) | (t & c)
+
+
+def _half_add(a: np.ndarray, b: np.ndarray):
+    """ Bitwise half adder, returns sum and carry. """
+    return a ^ b, a & b
+
+
+def _west(rows: np.ndarray) -> np.ndarray:
+    """ Every bit becomes bit of its west (x - 1) neighbor. """
+    out = rows << _ONE
+    out[:, 1:] |= rows[:, :-1] >> _LAST
+    return out
+
+
+def _east(rows: np.ndarray) -> np.ndarray:
+    """ Every bit becomes bit of its east (x + 1) neighbor. """
+    out = rows >> _ONE
+    out[:, :-1] |= rows[:, 1:] << _LAST
+    return out
+
+
+def _north(rows: np.ndarray) -> np.ndarray:
+    """ Every bit becomes bit of its north (y - 1) neighbor. """
+    out = np.zeros_like(rows)
+    out[1:] = rows[:-1]
+    return out
+
+
+def _south(rows: np.ndarray) -> np.ndarray:
+    """ Every bit becomes bit of its south (y + 1) neighbor. """
+    out = np.zeros_like(rows)
+    out[:-1] = rows[1:]
+    return out
+
+
+def neighbors_count_bits(rows: np.ndarray) -> tuple[np.ndarray, ...]:
+    """ Count neighbors of every cell of packed rows. Count is returned
+        bit-sliced, i.e. as four bit planes of weights 1, 2, 4 and 8.
+    """
+
+    west, east = _west(rows), _east(rows)
+    neighs = (
+        west, east,
+        _north(rows), _north(west), _north(east),
+        _south(rows), _south(west), _south(east),
+    )
+
+    s_a, c_a = _full_add(*neighs[0:3])
+    s_b, c_b = _full_add(*neighs[3:6])
+    s_c, c_c = _half_add(*neighs[6:8])
+
+    bit0, c_d = _full_add(s_a, s_b, s_c)
+    t, c_e = _full_add(c_a, c_b, c_c)
+    bit1, c_f = _half_add(t, c_d)
+    bit2, bit3 = _half_add(c_e, c_f)
+
+    return bit0, bit1, bit2, bit3
+
+
+def apply_rule(
+    rule: Rule, rows: np.ndarray, count_bits: tuple[np.ndarray, ...]
+) -> np.ndarray:
+    """ Compute next state of packed rows by rule from bit-sliced
+        neighbors counts. Rule's table is compiled into sum of products,
+        one product per neighbors count allowed by rule.
+    """
+
+    def count_mask(count: int) -> np.ndarray:
+        mask = ~np.zeros_like(rows)
+        for i, bit in enumerate(count_bits):
+            mask &= bit if count >> i & 1 else ~bit
+        return mask
+
+    result = np.zeros_like(rows)
+    for count in rule.births | rule.survivals:
+        mask = count_mask(count)
+        if count not in rule.survivals:
+            mask &= ~rows
+        elif count not in rule.births:
+            mask &= rows
+        result |= mask
+
+    return result
+
+
+def rows_cells(rows: np.ndarray, origin: tuple[int, int]) -> np.ndarray:
+    """ Return (N, 2) array of cells which bits are set in packed rows,
+        where origin is coordinates of first bit of rows[0, 0] word.
+    """
+
+    ys, words = np.nonzero(rows)
+    bits = np.unpackbits(
+        rows[ys, words].view(np.uint8).reshape(-1, 8),
+        axis=1, bitorder="little",
+    )
+    # Flat nonzero of booleans is much faster than 2D nonzero.
+    idx, bit = np.divmod(np.flatnonzero(bits.view(bool)), WORD_BITS)
+
+    return np.stack((
+        words[idx] * WORD_BITS + bit + origin[0],
+        ys[idx] + origin[1],
+    ), axis=1)
+
+
+class BitPackedCells:
+    """ Game of life engine that packs rows of cells into uint64 words,
+        64 cells per word. Has the same interface as Cells.
+    """
+
+    def __init__(
+        self, lived_cells: Optional[Iterable[Pos]] = None,
+        rule: Rule = CONWAY, margin: int = 8,
+    ):
+        """ Give only cells that alive and other is dead.
+            margin: count of dead rows (and words of columns) added around
+            alive cells when array is grown.
+        """
+
+        self.rule = rule
+        self.generation = 0
+        self.margin = max(margin, 1)
+
+        coords = cells_to_array(lived_cells)
+
+        if len(coords):
+            min_x, min_y = coords.min(axis=0)
+            max_x, max_y = coords.max(axis=0)
+        else:
+            min_x = min_y = max_x = max_y = 0
+
+        m = self.margin
+        words = (max_x - min_x) // WORD_BITS + 1
+
+        # Origin is coordinates of first bit of rows[0, 0] word.
+        self._origin = (int(min_x) - m*WORD_BITS, int(min_y) - m)
+        self._rows = np.zeros(
+            (max_y - min_y + 1 + 2*m, words + 2*m), np.dtype("<u8")
+        )
+
+        xs = coords[:, 0] - self._origin[0]
+        ys = coords[:, 1] - self._origin[1]
+        np.bitwise_or.at(
+            self._rows,
+            (ys, xs // WORD_BITS),
+            _ONE << (xs % WORD_BITS).astype(np.uint64),
+        )
+
+        # Rows before last generation (in the same frame) and keys of
+        # cells changed by it, which are computed on demand.
+        self._previous: Optional[np.ndarray] = None
+        self._changes: Optional[np.ndarray] = None
+
+        self.__update_bounding_box()
+
+    @property
+    def current_state(self) -> GameState:
+        """ Set of alive cells. """
+
+        cells = self.live_cells()
+        return set(zip(cells[:, 0].tolist(), cells[:, 1].tolist()))
+
+    def live_cells(self) -> np.ndarray:
+        """ Return (N, 2) array of alive cells. """
+        return rows_cells(self._rows, self._origin)
+
+    @property
+    def changes(self) -> Optional[np.ndarray]:
+        """ Packed keys of cells born or died at last generation,
+            None before first generation.
+        """
+
+        if self._changes is None and self._previous is not None:
+            self._changes = pack(
+                rows_cells(self._rows ^ self._previous, self._origin)
+            )
+        return self._changes
+
+    @property
+    def population(self) -> int:
+        """ Count of alive cells. """
+        return int(_POPCOUNT[self._rows.view(np.uint8)].sum(dtype=np.int64))
+
+    def step(self, n: int = 1) -> None:
+        """ Do next n iterations of game. """
+
+        for _ in range(n):
+            self.__step()
+        self.generation += n
+
+    def __step(self) -> None:
+
+        self.__fit_margin()
+
+        rows = self._rows
+        self._rows = apply_rule(self.rule, rows, neighbors_count_bits(rows))
+        self._previous = rows
+        self._changes = None
+
+        self.__update_bounding_box()
+
+    def __update_bounding_box(self) -> None:
+        rows = np.flatnonzero(self._rows.any(axis=1))
+        words = np.flatnonzero(self._rows.any(axis=0))
+
+        if not len(rows):
+            self._live_box = None
+            self.bounding_box = (0, 0, 0, 0)
+            return
+
+        self._live_box = (words[0], rows[0], words[-1], rows[-1])
+
+        first = int(np.bitwise_or.reduce(self._rows[:, words[0]]))
+        last = int(np.bitwise_or.reduce(self._rows[:, words[-1]]))
+        self.bounding_box = (
+            int(words[0]) * WORD_BITS + (first & -first).bit_length() - 1
+            + self._origin[0],
+            int(rows[0]) + self._origin[1],
+            int(words[-1]) * WORD_BITS + last.bit_length() - 1
+            + self._origin[0],
+            int(rows[-1]) + self._origin[1],
+        )
+
+    def __fit_margin(self) -> None:
+        """ Grow array if alive cells reach its outline (border rows and
+            words), shrink it if there's too much empty space.
+        """
+
+        if self._live_box is None:
+            return
+
+        h, w = self._rows.shape
+        w0, y0, w1, y1 = self._live_box
+        x_margins = (w0, w - 1 - w1)
+        y_margins = (y0, h - 1 - y1)
+
+        if (
+            min(*x_margins, *y_margins) >= 1
+            and max(x_margins) <= 4*self.margin + w // 2
+            and max(y_margins) <= 4*self.margin + h // 2
+        ):
+            return
+
+        # Margin grows with pattern, so expanding patterns
+        # are reallocated rarely.
+        m = max(self.margin, (y1 - y0 + 1) // 8)
+        mw = max(self.margin, (w1 - w0 + 1) // 8)
+        new_rows = np.zeros_like(
+            self._rows, shape=(y1 - y0 + 1 + 2*m, w1 - w0 + 1 + 2*mw)
+        )
+        new_rows[m:-m, mw:-mw] = self._rows[y0:y1 + 1, w0:w1 + 1]
+
+        self._origin = (
+            self._origin[0] + (w0 - mw) * WORD_BITS,
+            self._origin[1] + y0 - m,
+        )
+        self._rows = new_rows
+        self._live_box = (mw, m, mw + w1 - w0, m + y1 - y0)
@@ -7,6 +7,8 @@ import numpy as np
 
 import globals
 from module_typing import GameState, Pos, ShaderProgram
+from .rules import Rule, CONWAY
+from .packed_state import state_to_array, cells_to_array
 
 # Directions for evaluating neighbors count.
 dirs = ((-1, 0), (1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
@@ -17,6 +19,9 @@ def _neighbors_count(x: int, y: int, state: GameState) -> int:
 
 
 def _bounding_box(state: GameState) -> tuple[Pos, Pos, Pos, Pos]:
+    if not state:
+        return (0, 0, 0, 0)
+
     return (
         min(state, key=itemgetter(0))[0],
         min(state, key=itemgetter(1))[1],
@@ -29,20 +34,39 @@ class Cells:
     """ Class where game of life action takes place. """
 
     def __init__(
-        self, lived_cells: Optional[Iterable[Pos]] = None
+        self, lived_cells: Optional[Iterable[Pos]] = None,
+        rule: Rule = CONWAY,
     ):
         """ Give only cells that alive and other is dead. """
 
-        try:
-            self.current_state = set(lived_cells)
-        except TypeError:
-            self.current_state = set()
+        self.rule = rule
+        self.generation = 0
+
+        cells = cells_to_array(lived_cells)
+        self.current_state = set(
+            zip(cells[:, 0].tolist(), cells[:, 1].tolist())
+        )
 
         self.previous_state = set()
         self.bounding_box = _bounding_box(self.current_state)
 
-    def step(self) -> None:
-        """ Do next iteration of game. """
+    def live_cells(self) -> np.ndarray:
+        """ Return (N, 2) array of alive cells. """
+        return state_to_array(self.current_state)
+
+    @property
+    def population(self) -> int:
+        """ Count of alive cells. """
+        return len(self.current_state)
+
+    def step(self, n: int = 1) -> None:
+        """ Do next n iterations of game. """
+
+        for _ in range(n):
+            self.__step()
+        self.generation += n
+
+    def __step(self) -> None:
 
         self.previous_state = self.current_state.copy()
         self.current_state = set()
@@ -55,13 +79,10 @@ class Cells:
                 curr_pos = (x, y)
                 neighs = _neighbors_count(x, y, self.previous_state)
 
-                # Standard game of life rules:
-                # if live cell count of neighbors 2 or 3, then proceed as is,
-                # if dead one has 3, then proceed as live one.
-                if (
-                    (curr_pos in self.previous_state and neighs in {2, 3})
-                    or (curr_pos not in self.previous_state and neighs == 3)
-                ):
+                # Rule's table gives next state by current state and
+                # count of neighbors.
+                alive = int(curr_pos in self.previous_state)
+                if self.rule.table[alive, neighs]:
                     self.current_state.add(curr_pos)
 
         self.bounding_box = _bounding_box(self.current_state)
@@ -0,0 +1,250 @@
+""" Census of objects (still lifes, oscillators and spaceships) of
+    stabilized patterns, e.g. of soups finished by BatchCells.
+"""
+
+from collections import Counter, OrderedDict
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from .rules import Rule, CONWAY
+from .sparse import SparseCells
+from .cycles import CycleDetector, zobrist_hash
+from .packed_state import pack, unpack, state_to_keys
+
+# Matrices (a, b, c, d) of symmetries of square grid:
+# x' = a*x + b*y, y' = c*x + d*y.
+_SYMMETRIES = np.array((
+    (1, 0, 0, 1), (0, -1, 1, 0), (-1, 0, 0, -1), (0, 1, -1, 0),
+    (-1, 0, 0, 1), (0, 1, 1, 0), (1, 0, 0, -1), (0, -1, -1, 0),
+)).reshape(-1, 2, 2)
+
+# Common objects of Conway's game of life, named in census.
+KNOWN_OBJECTS = {
+    "block": ((0, 0), (1, 0), (0, 1), (1, 1)),
+    "beehive": ((1, 0), (2, 0), (0, 1), (3, 1), (1, 2), (2, 2)),
+    "loaf": ((1, 0), (2, 0), (0, 1), (3, 1), (1, 2), (3, 2), (2, 3)),
+    "boat": ((0, 0), (1, 0), (0, 1), (2, 1), (1, 2)),
+    "ship": ((0, 0), (1, 0), (0, 1), (2, 1), (1, 2), (2, 2)),
+    "tub": ((1, 0), (0, 1), (2, 1), (1, 2)),
+    "pond": (
+        (1, 0), (2, 0), (0, 1), (3, 1), (0, 2), (3, 2), (1, 3), (2, 3),
+    ),
+    "blinker": ((0, 0), (1, 0), (2, 0)),
+    "toad": ((1, 0), (2, 0), (3, 0), (0, 1), (1, 1), (2, 1)),
+    "beacon": ((0, 0), (1, 0), (0, 1), (3, 2), (2, 3), (3, 3)),
+    "glider": ((1, 0), (2, 1), (0, 2), (1, 2), (2, 2)),
+}
+
+
+class CensusObject(NamedTuple):
+    """ Classified object. Code is the same for all phases and
+        orientations of object: prefix is xs<population> for still
+        lifes, xp<period> for oscillators, xq<period> for spaceships,
+        xu for objects that aren't stable alone and xx for objects
+        that didn't repeat in time of simulation. It's followed by
+        hash of canonical form.
+    """
+
+    code: str
+    kind: str
+    period: Optional[int]
+    name: Optional[str] = None
+
+
+def components(cells, distance: int = 1) -> list[np.ndarray]:
+    """ Split cells (any game state) into connected components, where
+        cells are connected if they are not further than distance
+        from each other by both axes. Returns (N, 2) arrays.
+    """
+
+    keys = state_to_keys(cells)
+    if not len(keys):
+        return []
+
+    # Edges to neighbors in half of neighborhood, other half is
+    # the same edges reversed.
+    first, second = [], []
+    for dy in range(distance + 1):
+        for dx in range(-distance, distance + 1):
+            if dy == 0 and dx <= 0:
+                continue
+            targets = keys + ((dy << 32) + dx)
+            indices = np.minimum(np.searchsorted(keys, targets), len(keys) - 1)
+            found = np.flatnonzero(keys[indices] == targets)
+            first.append(found)
+            second.append(indices[found])
+    first = np.concatenate(first)
+    second = np.concatenate(second)
+
+    # Labels are pointers to parents, roots are the least cells
+    # of components.
+    labels = np.arange(len(keys))
+    while True:
+        a, b = labels[first], labels[second]
+        if np.array_equal(a, b):
+            break
+        np.minimum.at(labels, np.maximum(a, b), np.minimum(a, b))
+        while True:
+            parents = labels[labels]
+            if np.array_equal(parents, labels):
+                break
+            labels = parents
+
+    order = np.argsort(labels, kind="stable")
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    coords = unpack(keys)
+    return [coords[part] for part in np.split(order, bounds)]
+
+
+def canonical_form(cells) -> np.ndarray:
+    """ Sorted packed keys of cells transformed by one of 8 symmetries
+        and translated to origin, which is the same for all
+        orientations and positions of pattern.
+    """
+
+    coords = unpack(state_to_keys(cells))
+    if not len(coords):
+        return np.empty(0, np.int64)
+
+    best, best_bytes = None, None
+    for matrix in _SYMMETRIES:
+        transformed = coords @ matrix.T
+        transformed -= transformed.min(axis=0)
+        keys = np.sort(pack(transformed))
+        data = keys.tobytes()
+        if best_bytes is None or data < best_bytes:
+            best, best_bytes = keys, data
+
+    return best
+
+
+def canonical_hash(cells) -> int:
+    """ Hash of canonical form of cells. """
+    return zobrist_hash(canonical_form(cells))
+
+
+def classify(
+    cells, rule: Rule = CONWAY, generations: int = 64,
+) -> tuple[CensusObject, list[int]]:
+    """ Classify object by simulation of it alone for given count of
+        generations. Returns object and canonical hashes of all its
+        phases.
+    """
+
+    engine = SparseCells(cells, rule)
+    population = engine.population
+    detector = CycleDetector(capacity=generations + 1)
+    detector.observe(engine, 0)
+
+    hashes = [canonical_hash(engine.live_cells())]
+    for generation in range(1, generations + 1):
+        engine.step()
+        if detector.observe(engine, generation) is not None:
+            break
+        hashes.append(canonical_hash(engine.live_cells()))
+
+    cycle = detector.cycle
+    if cycle is None:
+        return CensusObject(f"xx_{hashes[0]:016x}", "unknown", None), \
+            hashes[:1]
+    if cycle.start:
+        return CensusObject(f"xu_{hashes[0]:016x}", "unstable", None), \
+            hashes[:1]
+
+    # Phases are identified by the least hash of them.
+    phases = hashes[:cycle.period]
+    identity = min(phases)
+    if cycle.displacement != (0, 0):
+        prefix, kind = f"xq{cycle.period}", "spaceship"
+    elif cycle.period > 1:
+        prefix, kind = f"xp{cycle.period}", "oscillator"
+    else:
+        prefix, kind = f"xs{population}", "still life"
+
+    return CensusObject(f"{prefix}_{identity:016x}", kind, cycle.period), \
+        phases
+
+
+class Census:
+    """ Counts of objects found in patterns. Objects are classified
+        by simulation, and results are kept in LRU cache by canonical
+        hashes of all phases, so that common objects are recognized
+        without simulation.
+
+        Objects are separated as connected components, so objects
+        made of separate parts (e.g. pulsar) are counted as unstable
+        parts, unless distance is increased.
+    """
+
+    def __init__(
+        self, rule: Rule = CONWAY, cache_size: int = 4096,
+        generations: int = 64, distance: int = 1,
+    ):
+        """ cache_size: count of canonical hashes kept in cache.
+            generations: count of generations object is simulated for.
+            distance: maximum distance between cells of one object.
+        """
+
+        self.rule = rule
+        self.cache_size = cache_size
+        self.generations = generations
+        self.distance = distance
+
+        self.counts: Counter[str] = Counter()
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[int, CensusObject] = OrderedDict()
+
+        # Names of known objects by code.
+        self.names: dict[str, str] = {}
+        if rule == CONWAY:
+            for name, cells in KNOWN_OBJECTS.items():
+                obj, _ = classify(cells, rule, generations)
+                self.names[obj.code] = name
+
+    @property
+    def hit_rate(self) -> float:
+        """ Part of objects recognized by cache. """
+
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def classify(self, cells) -> CensusObject:
+        """ Classify single object, by cache if it's possible. """
+
+        key = canonical_hash(cells)
+        obj = self._cache.get(key)
+        if obj is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return obj
+
+        self.misses += 1
+        obj, hashes = classify(cells, self.rule, self.generations)
+        obj = obj._replace(name=self.names.get(obj.code))
+        for phase in hashes:
+            self._cache[phase] = obj
+            self._cache.move_to_end(phase)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return obj
+
+    def add(self, cells) -> list[CensusObject]:
+        """ Classify and count all objects of pattern (any game state). """
+
+        objects = [
+            self.classify(component)
+            for component in components(cells, self.distance)
+        ]
+        self.counts.update(obj.code for obj in objects)
+        return objects
+
+    def summary(self) -> list[tuple[str, Optional[str], int]]:
+        """ Codes, names and counts of objects from the most common. """
+
+        return [
+            (code, self.names.get(code), count)
+            for code, count in self.counts.most_common()
+        ]
@@ -0,0 +1,127 @@
+""" Binary checkpoint of game state. File is fixed size header followed
+    by int32 coordinates of alive cells, so cells are memory-mapped
+    on loading instead of being parsed.
+
+    Header (little-endian, 64 bytes):
+        magic (8s), version (u32), flags (u32), generation (i64),
+        births and survivals of rule as bit masks (u16, u16),
+        bounding box (4 x i32), count of cells (u64).
+"""
+
+import os
+import struct
+import threading
+from typing import NamedTuple
+
+import numpy as np
+
+from .packed_state import state_to_array
+from .rules import Rule
+
+MAGIC = b"GOLCKPT\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIqHH4iQ12x")
+CHUNK_CELLS = 1 << 20
+
+
+class Checkpoint(NamedTuple):
+    """ Loaded checkpoint. Cells are read-only (N, 2) int32 array
+        mapped to file.
+    """
+
+    generation: int
+    rule: Rule
+    bounding_box: tuple[int, int, int, int]
+    cells: np.ndarray
+
+
+def _mask(counts) -> int:
+    return sum(1 << count for count in counts)
+
+
+def _counts(mask: int) -> list[int]:
+    return [count for count in range(9) if mask >> count & 1]
+
+
+def is_checkpoint(path: str) -> bool:
+    """ Whether file at path is checkpoint. """
+
+    try:
+        with open(path, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def save_checkpoint(
+    path: str, cells, rule: Rule, generation: int,
+    bounding_box: tuple[int, int, int, int],
+) -> None:
+    """ Write cells (any game state or array of cells) to checkpoint.
+        Cells are streamed by chunks, so that no full copy of them is
+        made. File is written aside and then replaces old one, so that
+        checkpoint is never left half-written.
+    """
+
+    cells = state_to_array(cells)
+    header = HEADER.pack(
+        MAGIC, VERSION, 0, generation,
+        _mask(rule.births), _mask(rule.survivals),
+        *map(int, bounding_box), len(cells),
+    )
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(header)
+        for start in range(0, len(cells), CHUNK_CELLS):
+            chunk = cells[start:start + CHUNK_CELLS].astype("<i4")
+            file.write(memoryview(chunk))
+    os.replace(tmp_path, path)
+
+
+def save_checkpoint_async(
+    path: str, cells, rule: Rule, generation: int,
+    bounding_box: tuple[int, int, int, int],
+) -> threading.Thread:
+    """ Write checkpoint in background thread, which is returned.
+        Cells must not be modified while it's written, e.g. they are
+        cells of Snapshot.
+    """
+
+    thread = threading.Thread(
+        target=save_checkpoint,
+        args=(path, cells, rule, generation, bounding_box),
+    )
+    thread.start()
+    return thread
+
+
+def load_checkpoint(path: str) -> Checkpoint:
+    """ Load checkpoint. Cells aren't read, but mapped to memory. """
+
+    with open(path, "rb") as file:
+        data = file.read(HEADER.size)
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is too short to be checkpoint")
+
+    (
+        magic, version, _, generation, births, survivals,
+        min_x, min_y, max_x, max_y, count,
+    ) = HEADER.unpack(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not checkpoint")
+    if version != VERSION:
+        raise ValueError(f"unsupported checkpoint version {version}")
+
+    if count:
+        cells = np.memmap(
+            path, np.dtype("<i4"), "r", HEADER.size, (count, 2)
+        )
+    else:
+        cells = np.empty((0, 2), np.int32)
+        cells.flags.writeable = False
+
+    return Checkpoint(
+        generation, Rule(_counts(births), _counts(survivals)),
+        (min_x, min_y, max_x, max_y), cells,
+    )
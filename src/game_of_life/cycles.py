@@ -0,0 +1,239 @@
+""" Detection of cycles (oscillators and spaceships) by hashing of game
+    states, and fast-forward of cycled patterns.
+"""
+
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from .packed_state import state_to_keys
+from .engine import create_like
+
+# Interval of full hashing used by engines' drivers (game, precompute
+# worker), so that engines without changes of cells aren't hashed
+# every generation.
+REHASH_INTERVAL = 16
+
+_LOW_MASK = (1 << 32) - 1
+_X_BIAS = 1 << 31
+
+# Constants of SplitMix64 finalizer.
+_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+_MUL_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MUL_2 = np.uint64(0x94D049BB133111EB)
+
+
+def cell_hashes(keys: np.ndarray) -> np.ndarray:
+    """ Pseudo-random 64-bit hash of every packed cell key. """
+
+    z = keys.astype(np.uint64) + _GAMMA
+    z = (z ^ (z >> np.uint64(30))) * _MUL_1
+    z = (z ^ (z >> np.uint64(27))) * _MUL_2
+    return z ^ (z >> np.uint64(31))
+
+
+def zobrist_hash(keys: np.ndarray) -> int:
+    """ Hash of state given by packed keys, i.e. XOR of its cells hashes.
+        Since every cell is XORed in and out, hash of next state is
+        previous one XORed with hashes of born and died cells.
+    """
+    return int(np.bitwise_xor.reduce(cell_hashes(keys), initial=0))
+
+
+def _normalize(keys: np.ndarray, corner: tuple[int, int]) -> np.ndarray:
+    """ Translate packed keys, so that corner moves to (0, 0). """
+    return keys - ((corner[1] << 32) + corner[0])
+
+
+class Cycle(NamedTuple):
+    """ State of generation start + period is state of generation start
+        translated by displacement (dx, dy).
+    """
+
+    start: int
+    period: int
+    displacement: tuple[int, int]
+
+    @property
+    def is_still(self) -> bool:
+        """ Whether pattern doesn't change at all. """
+        return self.period == 1 and self.displacement == (0, 0)
+
+
+class CycleDetector:
+    """ Keeps hashes of recent states in bounded table and detects
+        when state repeats. Hash is updated incrementally by changed
+        cells when it's possible.
+    """
+
+    def __init__(
+        self, capacity: int = 4096, translations: bool = True,
+        interval: int = 1,
+    ):
+        """ capacity: count of recent states kept, i.e. maximum period.
+            translations: if True, hash is invariant to translation,
+            so that spaceships are detected as well, otherwise only
+            oscillators are.
+            interval: state that can't be hashed incrementally is hashed
+            only at generations that are multiples of interval. Periods
+            of such patterns are found as multiples of interval.
+        """
+
+        self.capacity = capacity
+        self.translations = translations
+        self.interval = max(interval, 1)
+        self.cycle: Optional[Cycle] = None
+        self.hash: Optional[int] = None
+
+        # Hash -> (generation, corner of bounding box).
+        self._table: OrderedDict[int, tuple[int, tuple[int, int]]] = \
+            OrderedDict()
+        self._corner: Optional[tuple[int, int]] = None
+        self._generation: Optional[int] = None
+        # Engine observed last time. Its changes are valid only if it's
+        # the same engine observed at previous generation.
+        self._source = None
+
+    def reset(self) -> None:
+        """ Forget all states, e.g. when pattern is replaced. """
+
+        self.cycle = None
+        self.hash = None
+        self._table.clear()
+        self._corner = None
+        self._generation = None
+        self._source = None
+
+    def observe(self, cells, generation: int) -> Optional[Cycle]:
+        """ Record state of engine at given generation. Returns cycle,
+            once it's detected. Hash is updated by changes of engine if
+            it records them (e.g. SparseCells, DenseCells) and its
+            bounding box didn't move, otherwise the whole state is hashed,
+            but only every interval generations.
+        """
+
+        if self.cycle is not None:
+            return self.cycle
+
+        if self.translations:
+            corner = tuple(cells.bounding_box[:2])
+        else:
+            corner = (0, 0)
+
+        changes = None
+        if (
+            cells is self._source and self.hash is not None
+            and generation == self._generation + 1
+            and corner == self._corner
+        ):
+            changes = getattr(cells, "changes", None)
+        self._source = cells
+
+        if changes is not None:
+            self.hash ^= zobrist_hash(_normalize(changes, corner))
+        elif generation % self.interval == 0:
+            # Most engines build set of cells by current_state property,
+            # so only packed state stored in engine is used.
+            state = vars(cells).get("current_state")
+            keys = getattr(state, "keys", None)
+            if keys is None:
+                keys = state_to_keys(cells.live_cells())
+            self.hash = zobrist_hash(_normalize(keys, corner))
+        else:
+            self.hash = None
+            return None
+
+        return self.__record(generation, corner)
+
+    def update(
+        self, keys: np.ndarray, generation: int,
+        changes: Optional[np.ndarray] = None,
+    ) -> Optional[Cycle]:
+        """ Record state given by sorted packed keys at given generation.
+            changes: keys of cells born and died since previous
+            generation, which must be the previous recorded one.
+        """
+
+        if self.cycle is not None:
+            return self.cycle
+
+        if not self.translations:
+            corner = (0, 0)
+        elif len(keys):
+            xs = (keys & _LOW_MASK) - _X_BIAS
+            corner = (int(xs.min()), int(keys[0] >> 32))
+        else:
+            corner = (0, 0)
+
+        if self.hash is not None and changes is not None \
+                and corner == self._corner:
+            self.hash ^= zobrist_hash(_normalize(changes, corner))
+        else:
+            self.hash = zobrist_hash(_normalize(keys, corner))
+        self._source = None
+
+        return self.__record(generation, corner)
+
+    def __record(
+        self, generation: int, corner: tuple[int, int],
+    ) -> Optional[Cycle]:
+        """ Look hash of state up in table and add it there. """
+
+        self._corner = corner
+        self._generation = generation
+
+        seen = self._table.get(self.hash)
+        if seen is not None:
+            start, start_corner = seen
+            self.cycle = Cycle(start, generation - start, (
+                corner[0] - start_corner[0], corner[1] - start_corner[1]
+            ))
+            return self.cycle
+
+        self._table[self.hash] = (generation, corner)
+        if len(self._table) > self.capacity:
+            self._table.popitem(last=False)
+
+        return None
+
+
+def fast_forward(
+    cells, cycle: Cycle, generation: int, target: int,
+) -> tuple[object, int]:
+    """ Advance engine from generation to target generation
+        (both not before start of cycle) by stepping only remainder
+        and one period, and translating cells by the rest of periods.
+        Cycles are detected by hashes, so the stepped period checks
+        that state really repeats. Returns engine (new one if pattern
+        had to be translated, old one is closed) and generation
+        it's at, which is before target if state didn't repeat.
+    """
+
+    periods, remainder = divmod(target - generation, cycle.period)
+    if periods < 2:
+        cells.step(target - generation)
+        return cells, target
+
+    cells.step(remainder)
+    dx, dy = cycle.displacement
+    before = state_to_keys(cells.live_cells())
+    cells.step(cycle.period)
+    generation += remainder + cycle.period
+    after = state_to_keys(cells.live_cells())
+    if not np.array_equal(after, before + ((dy << 32) + dx)):
+        return cells, generation
+
+    if (dx, dy) == (0, 0):
+        return cells, target
+
+    periods -= 1
+    translated = cells.live_cells() + (periods * dx, periods * dy)
+    new_cells = create_like(cells, translated)
+    new_cells.generation = cells.generation + periods * cycle.period
+
+    close = getattr(cells, "close", None)
+    if close is not None:
+        close()
+
+    return new_cells, target
@@ -0,0 +1,176 @@
+""" Dense game of life engine, where cells are stored in NumPy array. """
+
+from typing import Optional, Iterable
+
+import numpy as np
+
+from module_typing import GameState, Pos
+from .rules import Rule, CONWAY
+from .packed_state import cells_to_array, pack
+
+# Minimal count of dead cells between alive ones and border of array.
+# Two cells guarantee that border cells have no alive neighbors,
+# so they can be skipped while counting.
+MIN_MARGIN = 2
+
+
+def neighbors_count(grid: np.ndarray) -> np.ndarray:
+    """ Count alive neighbors of every inner cell of grid, i.e. result
+        has shape of grid without its outline. Grid can be stack of
+        grids, then last two axes are used.
+    """
+
+    h, w = grid.shape[-2:]
+    counts = np.zeros((*grid.shape[:-2], h - 2, w - 2), np.uint8)
+    for dy in range(3):
+        for dx in range(3):
+            if dy != 1 or dx != 1:
+                counts += grid[..., dy:dy + h - 2, dx:dx + w - 2]
+
+    return counts
+
+
+class DenseCells:
+    """ Game of life engine that keeps region with alive cells as
+        uint8 array and steps it with vectorized neighbors counting.
+        Has the same interface as Cells.
+    """
+
+    def __init__(
+        self, lived_cells: Optional[Iterable[Pos]] = None,
+        rule: Rule = CONWAY, margin: int = 8,
+    ):
+        """ Give only cells that alive and other is dead.
+            margin: count of dead cells added around alive ones
+            when array is grown.
+        """
+
+        self.rule = rule
+        self.generation = 0
+        self.margin = max(margin, MIN_MARGIN)
+
+        coords = cells_to_array(lived_cells)
+
+        if len(coords):
+            min_x, min_y = coords.min(axis=0)
+            max_x, max_y = coords.max(axis=0)
+        else:
+            min_x = min_y = max_x = max_y = 0
+
+        # Origin is coordinates of grid[0, 0] cell.
+        self._origin = (int(min_x) - self.margin, int(min_y) - self.margin)
+        self._grid = np.zeros(
+            (max_y - min_y + 1 + 2*self.margin,
+             max_x - min_x + 1 + 2*self.margin),
+            np.uint8,
+        )
+        self._grid[
+            coords[:, 1] - self._origin[1], coords[:, 0] - self._origin[0]
+        ] = 1
+
+        # Grid before last generation (in the same frame) and keys of
+        # cells changed by it, which are computed on demand.
+        self._previous: Optional[np.ndarray] = None
+        self._changes: Optional[np.ndarray] = None
+
+        self.__update_bounding_box()
+
+    @property
+    def current_state(self) -> GameState:
+        """ Set of alive cells. """
+
+        cells = self.live_cells()
+        return set(zip(cells[:, 0].tolist(), cells[:, 1].tolist()))
+
+    def live_cells(self) -> np.ndarray:
+        """ Return (N, 2) array of alive cells. """
+
+        ys, xs = np.nonzero(self._grid)
+        return np.stack((xs + self._origin[0], ys + self._origin[1]), axis=1)
+
+    @property
+    def population(self) -> int:
+        """ Count of alive cells. """
+        return int(np.count_nonzero(self._grid))
+
+    @property
+    def changes(self) -> Optional[np.ndarray]:
+        """ Packed keys of cells born or died at last generation,
+            None before first generation.
+        """
+
+        if self._changes is None and self._previous is not None:
+            # Flat nonzero is much faster than 2D one.
+            changed = np.flatnonzero(self._grid != self._previous)
+            ys, xs = np.divmod(changed, self._grid.shape[1])
+            self._changes = pack(np.stack(
+                (xs + self._origin[0], ys + self._origin[1]), axis=1
+            ))
+        return self._changes
+
+    def step(self, n: int = 1) -> None:
+        """ Do next n iterations of game. """
+
+        for _ in range(n):
+            self.__step()
+        self.generation += n
+
+    def __step(self) -> None:
+
+        self.__fit_margin()
+
+        grid = self._grid
+        counts = neighbors_count(grid)
+        inner = grid[1:-1, 1:-1]
+
+        new_grid = np.zeros_like(grid)
+        new_grid[1:-1, 1:-1] = self.rule.lookup(inner, counts)
+        self._grid = new_grid
+        self._previous = grid
+        self._changes = None
+
+        self.__update_bounding_box()
+
+    def __update_bounding_box(self) -> None:
+        rows = np.flatnonzero(self._grid.any(axis=1))
+        cols = np.flatnonzero(self._grid.any(axis=0))
+
+        if len(rows):
+            self._live_box = (cols[0], rows[0], cols[-1], rows[-1])
+            self.bounding_box = (
+                int(cols[0]) + self._origin[0],
+                int(rows[0]) + self._origin[1],
+                int(cols[-1]) + self._origin[0],
+                int(rows[-1]) + self._origin[1],
+            )
+        else:
+            self._live_box = None
+            self.bounding_box = (0, 0, 0, 0)
+
+    def __fit_margin(self) -> None:
+        """ Grow array if alive cells come too close to its border,
+            shrink it if there's too much empty space.
+        """
+
+        if self._live_box is None:
+            return
+
+        h, w = self._grid.shape
+        x0, y0, x1, y1 = self._live_box
+        margins = (x0, y0, w - 1 - x1, h - 1 - y1)
+
+        if (
+            min(margins) >= MIN_MARGIN
+            and max(margins) <= 4*self.margin + max(w, h) // 2
+        ):
+            return
+
+        # Margin grows with pattern, so expanding patterns
+        # are reallocated rarely.
+        m = max(self.margin, (max(x1 - x0, y1 - y0) + 1) // 8)
+        new_grid = np.zeros((y1 - y0 + 1 + 2*m, x1 - x0 + 1 + 2*m), np.uint8)
+        new_grid[m:-m, m:-m] = self._grid[y0:y1 + 1, x0:x1 + 1]
+
+        self._origin = (self._origin[0] + x0 - m, self._origin[1] + y0 - m)
+        self._grid = new_grid
+        self._live_box = (m, m, m + x1 - x0, m + y1 - y0)
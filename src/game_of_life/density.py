@@ -0,0 +1,64 @@
+""" Level of detail helpers: density of cells per screen pixel,
+    which is drawn instead of separate cells when view is zoomed out.
+"""
+
+import math
+from typing import Optional
+
+import numpy as np
+
+Rect = tuple[float, float, float, float]
+
+
+def visible_rect(i_view_matrix: np.matrix, i_proj_matrix: np.matrix) -> Rect:
+    """ Rectangle of grid (min_x, min_y, max_x, max_y) visible on screen,
+        i.e. normalized device coordinates [-1, 1] mapped to grid.
+    """
+
+    corners = i_view_matrix * i_proj_matrix * np.matrix((
+        (-1, 1), (-1, 1), (0, 0), (1, 1)
+    ), np.float32)
+    return (
+        float(corners[0].min()), float(corners[1].min()),
+        float(corners[0].max()), float(corners[1].max()),
+    )
+
+
+def pixels_per_cell(
+    view_matrix: np.matrix, proj_matrix: np.matrix, viewport_width: int
+) -> float:
+    """ Size of one cell on screen in pixels. """
+    return float(view_matrix[0, 0] * proj_matrix[0, 0]) * viewport_width / 2
+
+
+def density_grid(
+    offsets: np.ndarray, rect: Rect, bucket_size: float,
+    bounding_box: Optional[Rect] = None,
+) -> tuple[np.ndarray, Rect]:
+    """ Aggregate cells with given offsets into square buckets.
+        Returns array of fraction of alive cells per bucket (indexed
+        [y, x]) and rectangle it covers, which is visible rectangle
+        clipped by bounding box of cells, if given, and aligned to buckets.
+    """
+
+    x0, y0, x1, y1 = rect
+    if bounding_box is not None:
+        x0, y0 = max(x0, bounding_box[0]), max(y0, bounding_box[1])
+        x1, y1 = min(x1, bounding_box[2] + 1), min(y1, bounding_box[3] + 1)
+
+    x0 = math.floor(x0 / bucket_size) * bucket_size
+    y0 = math.floor(y0 / bucket_size) * bucket_size
+    w = max(math.ceil((x1 - x0) / bucket_size), 1)
+    h = max(math.ceil((y1 - y0) / bucket_size), 1)
+
+    # Cell is counted in bucket with its center.
+    xs = np.floor((offsets[:, 0] + 0.5 - x0) / bucket_size).astype(np.int64)
+    ys = np.floor((offsets[:, 1] + 0.5 - y0) / bucket_size).astype(np.int64)
+    inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+
+    counts = np.bincount(
+        ys[inside] * w + xs[inside], minlength=w*h
+    ).reshape(h, w)
+
+    density = np.minimum(counts / bucket_size**2, 1).astype(np.float32)
+    return density, (x0, y0, x0 + w*bucket_size, y0 + h*bucket_size)
@@ -0,0 +1,231 @@
+""" Common interface of game of life engines, registry of them and policy
+    of choosing engine that suits current pattern.
+"""
+
+from typing import Optional, Protocol, runtime_checkable
+
+import numpy as np
+
+from .rules import Rule, CONWAY
+from .cells import Cells
+from .sparse import SparseCells
+from .dense import DenseCells
+from .bitpacked import BitPackedCells
+from .tiled import TiledCells
+from .parallel import ParallelCells
+from .hashlife import HashLife
+from .mapped import MappedCells
+from .packed_state import state_to_keys
+
+
+@runtime_checkable
+class Engine(Protocol):
+    """ Interface every game of life engine has. Engines are created
+        as engine_type(lived_cells, rule), where lived_cells is any
+        iterable of positions or (N, 2) array.
+    """
+
+    rule: Rule
+    generation: int
+
+    def step(self, n: int = 1) -> None:
+        """ Do next n iterations of game. """
+
+    def live_cells(self) -> np.ndarray:
+        """ Return (N, 2) array of alive cells. """
+
+    @property
+    def bounding_box(self) -> tuple[int, int, int, int]:
+        """ Bounding box of alive cells as (min_x, min_y, max_x, max_y). """
+
+    @property
+    def population(self) -> int:
+        """ Count of alive cells. """
+
+
+ENGINES: dict[str, type] = {}
+
+# Options of engines' constructors, which engines keep as attributes
+# of the same names.
+_OPTIONS = ("processes", "margin", "tile_size", "cache_tiles", "max_nodes")
+
+
+def register_engine(name: str, engine_type: type) -> None:
+    """ Make engine type available by name. """
+    ENGINES[name] = engine_type
+
+
+def engine_name(engine: Engine) -> Optional[str]:
+    """ Name engine type is registered with. """
+
+    for name, engine_type in ENGINES.items():
+        if type(engine) is engine_type:
+            return name
+    return None
+
+
+def create_engine(name: str, lived_cells=None, rule: Rule = CONWAY) -> Engine:
+    """ Create engine registered with given name. """
+
+    try:
+        engine_type = ENGINES[name]
+    except KeyError:
+        raise ValueError(f"unknown engine {name!r}") from None
+    return engine_type(lived_cells, rule)
+
+
+def create_like(
+    engine: Engine, lived_cells=None, rule: Optional[Rule] = None,
+) -> Engine:
+    """ Create engine of the same type and options (e.g. processes
+        of ParallelCells) as given one, but with given cells and rule
+        (engine's one by default).
+    """
+
+    options = {
+        name: getattr(engine, name) for name in _OPTIONS
+        if hasattr(engine, name)
+    }
+    return type(engine)(lived_cells, rule or engine.rule, **options)
+
+
+def convert_engine(engine: Engine, name: str) -> Engine:
+    """ Move state of engine (cells, rule and generation) to new engine
+        of given type. Old engine is closed, if it has to be.
+    """
+
+    new_engine = create_engine(name, engine.live_cells(), engine.rule)
+    new_engine.generation = engine.generation
+
+    close = getattr(engine, "close", None)
+    if close is not None:
+        close()
+
+    return new_engine
+
+
+register_engine("cells", Cells)
+register_engine("sparse", SparseCells)
+register_engine("dense", DenseCells)
+register_engine("bitpacked", BitPackedCells)
+register_engine("tiled", TiledCells)
+register_engine("parallel", ParallelCells)
+register_engine("hashlife", HashLife)
+register_engine("mapped", MappedCells)
+
+
+class EnginePolicy:
+    """ Chooses engine by density of pattern (population per area
+        of bounding box) and activity (part of cells changed at one
+        generation):
+        - dense patterns, e.g. soups, are stepped by dense grid;
+        - big patterns of low activity, e.g. settled debris and
+          ships, are stepped by tree-based engine;
+        - others are stepped by sparse engine.
+        Choice is changed only if it's the same two evaluations in row,
+        so that engines don't flap on the boundary.
+
+        Tree-based engine pays off only when it's stepped by big
+        batches, since every single step (and live_cells after it)
+        walks the whole tree. Callers that step by one generation,
+        e.g. to detect cycles, should pass tree=None. Callers that
+        observe cycles every generation should pass observed=True.
+    """
+
+    def __init__(
+        self, interval: int = 256, dense_density: float = 0.05,
+        tree_activity: float = 0.01, tree_population: int = 10_000,
+        dense: str = "bitpacked", sparse: str = "sparse",
+        tree: Optional[str] = "hashlife", observed: bool = False,
+    ):
+        """ interval: count of generations between evaluations.
+            dense_density: minimum density for dense engine.
+            tree_activity: maximum activity for tree-based engine.
+            tree_population: minimum population for tree-based engine.
+            dense, sparse, tree: names of engines to choose from,
+            tree may be None to never choose tree-based engine.
+            observed: whether caller observes every generation by
+            CycleDetector. Then tree-based engine is never chosen and
+            dense one must record changes of cells, since otherwise
+            every observed state would be hashed in full.
+        """
+
+        if observed:
+            tree = None
+            if not hasattr(ENGINES[dense], "changes"):
+                raise ValueError(
+                    f"engine {dense!r} doesn't record changes of cells"
+                )
+
+        self.interval = interval
+        self.dense_density = dense_density
+        self.tree_activity = tree_activity
+        self.tree_population = tree_population
+        self.dense = dense
+        self.sparse = sparse
+        self.tree = tree
+        self.observed = observed
+
+        self.density = 0.0
+        self.activity = 0.0
+        self._candidate: Optional[str] = None
+
+    def is_due(self, generation: int) -> bool:
+        """ Whether engine should be evaluated at this generation. """
+        return generation % self.interval == 0
+
+    def choose(self, engine: Engine) -> Optional[str]:
+        """ Measure engine over one generation (it's stepped) and return
+            name of engine to switch to or None to keep current one.
+        """
+
+        before = state_to_keys(engine.live_cells())
+        engine.step()
+        after = state_to_keys(engine.live_cells())
+
+        population = len(after)
+        if not population:
+            return None
+
+        min_x, min_y, max_x, max_y = engine.bounding_box
+        area = (max_x - min_x + 1) * (max_y - min_y + 1)
+        changed = len(np.setxor1d(before, after, assume_unique=True))
+
+        self.density = population / area
+        self.activity = changed / population
+
+        if self.density >= self.dense_density:
+            choice = self.dense
+        elif self.tree is not None \
+                and self.activity <= self.tree_activity \
+                and population >= self.tree_population:
+            choice = self.tree
+        else:
+            choice = self.sparse
+
+        candidate, self._candidate = self._candidate, choice
+        if choice != candidate or choice == engine_name(engine):
+            return None
+        return choice
+
+    def step(self, engine: Engine, generation: int, n: int = 1) -> Engine:
+        """ Step engine at given generation by n generations. Engine is
+            stepped by one batch between evaluations, at which it may
+            be replaced by chosen one. Returns engine at the end.
+        """
+
+        end = generation + n
+        while generation < end:
+            if self.is_due(generation):
+                choice = self.choose(engine)
+                if choice is not None:
+                    engine = convert_engine(engine, choice)
+                generation += 1
+
+            due = -(-generation // self.interval) * self.interval
+            count = min(due, end) - generation
+            if count > 0:
+                engine.step(count)
+                generation += count
+
+        return engine
@@ -0,0 +1,375 @@
+""" Offscreen export of game to PNG frames or animated GIF. Cells are
+    rasterized by NumPy with the same view and projection matrices as
+    OpenGL renderer uses, so no OpenGL context (nor display) is needed.
+
+    Frames are written as they are produced, and only the previous
+    frame is kept, so that memory doesn't depend on length of run.
+"""
+
+import os
+import struct
+import zlib
+from typing import Optional
+
+import numpy as np
+
+from .view import projection_matrix, fit_view_matrix
+
+# Colors of renderer: background is clear color, cells are drawn
+# by fragment shader.
+BACKGROUND = (250, 249, 248)
+FOREGROUND = (26, 26, 26)
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# LZW codes of GIF with 8-bit pixels.
+_GIF_CLEAR = 256
+_GIF_END = 257
+_GIF_FIRST = 258
+# Codes after clear code, at which decoder widens codes to 10, 11
+# and 12 bits.
+_GIF_WIDENS = (255, 767, 1791)
+# Count of pixels written as they are between clear codes,
+# so that codes don't widen.
+_GIF_LITERALS = 254
+# Runs are split, so that their codes fit into dictionary.
+_GIF_MAX_RUN = 1 << 20
+
+
+def make_palette(
+    background=BACKGROUND, foreground=FOREGROUND,
+) -> np.ndarray:
+    """ (256, 3) palette from background (coverage 0) to foreground
+        (coverage 255) color.
+    """
+
+    t = np.linspace(0, 1, 256)[:, None]
+    colors = (1 - t) * np.array(background) + t * np.array(foreground)
+    return np.round(colors).astype(np.uint8)
+
+
+class Rasterizer:
+    """ Rasterizes cells into (height, width) uint8 image of coverage
+        of pixels by cells. When cell is at least one pixel, pixel is
+        covered by cell at its center (as OpenGL does). Otherwise
+        pixel shows density of cells in it (as density shader does).
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.proj_matrix = projection_matrix(width, height)
+
+    def render(self, cells: np.ndarray, view_matrix: np.matrix) -> np.ndarray:
+        """ Rasterize (N, 2) array of cells seen through view matrix. """
+
+        # Pixel of point (x, y) is (ax*x + bx, by - ay*y), rows go down.
+        matrix = self.proj_matrix * view_matrix
+        ax = float(matrix[0, 0]) * self.width / 2
+        bx = (float(matrix[0, 3]) + 1) * self.width / 2
+        ay = float(matrix[1, 1]) * self.height / 2
+        by = (1 - float(matrix[1, 3])) * self.height / 2
+
+        if ax >= 1:
+            return self.__render_cells(cells, ax, bx, ay, by)
+        return self.__render_density(cells, ax, bx, ay, by)
+
+    def __render_cells(self, cells, ax, bx, ay, by) -> np.ndarray:
+        # Cells under centers of pixels.
+        cols = np.floor((np.arange(self.width) + 0.5 - bx) / ax)
+        rows = np.floor((by - np.arange(self.height) - 0.5) / ay)
+        cols, rows = cols.astype(np.int64), rows.astype(np.int64)
+        x0, y0 = int(cols[0]), int(rows[-1])
+        w, h = int(cols[-1]) - x0 + 1, int(rows[0]) - y0 + 1
+
+        xs = cells[:, 0] - x0
+        ys = cells[:, 1] - y0
+        inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+
+        grid = np.zeros((h, w), np.uint8)
+        grid[ys[inside], xs[inside]] = 255
+        return grid[(rows - y0)[:, None], (cols - x0)[None, :]]
+
+    def __render_density(self, cells, ax, bx, ay, by) -> np.ndarray:
+        # Cell is counted in pixel with its center.
+        xs = np.floor(ax * (cells[:, 0] + 0.5) + bx).astype(np.int64)
+        ys = np.floor(by - ay * (cells[:, 1] + 0.5)).astype(np.int64)
+        inside = (xs >= 0) & (xs < self.width) \
+            & (ys >= 0) & (ys < self.height)
+
+        counts = np.bincount(
+            ys[inside] * self.width + xs[inside],
+            minlength=self.width * self.height,
+        ).reshape(self.height, self.width)
+
+        # Pixel is fully covered by 1 / (ax*ay) cells.
+        coverage = np.minimum(counts * (ax * ay), 1)
+        return np.round(coverage * 255).astype(np.uint8)
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data \
+        + struct.pack(">I", zlib.crc32(tag + data))
+
+
+def write_png(
+    path: str, pixels: np.ndarray, palette: np.ndarray, level: int = 6,
+) -> None:
+    """ Write (height, width) uint8 image as PNG with given palette. """
+
+    height, width = pixels.shape
+    # Every row starts with filter type, 0 is none.
+    raw = np.zeros((height, width + 1), np.uint8)
+    raw[:, 1:] = pixels
+
+    with open(path, "wb") as file:
+        file.write(_PNG_SIGNATURE)
+        file.write(_png_chunk(
+            b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)
+        ))
+        file.write(_png_chunk(b"PLTE", palette.tobytes()))
+        file.write(_png_chunk(b"IDAT", zlib.compress(raw.tobytes(), level)))
+        file.write(_png_chunk(b"IEND", b""))
+
+
+class PngWriter:
+    """ Writes frames as numbered PNG files. """
+
+    def __init__(self, pattern: str, palette: np.ndarray, level: int = 6):
+        """ pattern: path with format field for number of frame,
+            e.g. frames/{:05d}.png.
+        """
+
+        self.pattern = pattern
+        self.palette = palette
+        self.level = level
+        self.frames = 0
+
+        directory = os.path.dirname(pattern)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, pixels: np.ndarray) -> None:
+        """ Write next frame. """
+
+        write_png(
+            self.pattern.format(self.frames), pixels, self.palette,
+            self.level,
+        )
+        self.frames += 1
+
+    def close(self) -> None:
+        """ Nothing to finish, every frame is separate file. """
+
+
+def _gif_widths(indices: np.ndarray) -> np.ndarray:
+    """ Width of codes with given indices after clear code. """
+
+    widths = np.full(len(indices), 9, np.int64)
+    for index in _GIF_WIDENS:
+        widths += indices >= index
+    return widths
+
+
+def _gif_run_codes(pixels: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ LZW codes and their widths, where every run of the same pixels
+        is written after clear code. Run of pixel c is written as
+        strings c, cc, ccc... (codes c, 258, 259...), every of which
+        is added to dictionary just before it's used. So encoding is
+        vectorized and run of length k takes about sqrt(2k) codes.
+    """
+
+    starts = np.flatnonzero(np.diff(pixels)) + 1
+    starts = np.concatenate(([0], starts))
+    lengths = np.diff(np.append(starts, len(pixels)))
+
+    pieces = -(-lengths // _GIF_MAX_RUN)
+    if pieces.max() > 1:
+        piece = np.arange(pieces.sum()) - np.repeat(
+            np.cumsum(pieces) - pieces, pieces
+        )
+        starts = np.repeat(starts, pieces) + piece * _GIF_MAX_RUN
+        lengths = np.diff(np.append(starts, len(pixels)))
+
+    # Strings of lengths 1..m and the rest of run.
+    m = ((np.sqrt(8 * lengths + 1) - 1) // 2).astype(np.int64)
+    rest = lengths - m * (m + 1) // 2
+    counts = 1 + m + (rest > 0)
+
+    offsets = np.cumsum(counts) - counts
+    # Index of code after clear code, which is -1.
+    index = np.arange(counts.sum()) - np.repeat(offsets + 1, counts)
+    run = np.repeat(np.arange(len(starts)), counts)
+    color = pixels[starts][run].astype(np.int64)
+
+    codes = np.where(index == 0, color, _GIF_FIRST - 1 + index)
+    tail = (index == m[run]) & (rest[run] > 0)
+    codes[tail] = np.where(
+        rest[run][tail] == 1, color[tail], _GIF_FIRST - 2 + rest[run][tail]
+    )
+    codes[index == -1] = _GIF_CLEAR
+
+    widths = _gif_widths(index)
+    # Clear code is read with width of the previous run.
+    widths[offsets[1:]] = _gif_widths(counts[:-1] - 1)
+    widths[0] = 9
+
+    codes = np.append(codes, _GIF_END)
+    widths = np.append(widths, _gif_widths(counts[-1:] - 1))
+    return codes, widths
+
+
+def _gif_literal_codes(pixels: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ LZW codes and their widths, where pixels are written as they
+        are with clear code every 254 pixels, so that codes stay 9 bits
+        wide. It's smaller for noisy frames.
+    """
+
+    codes = np.insert(
+        pixels.astype(np.int64), np.arange(0, len(pixels), _GIF_LITERALS),
+        _GIF_CLEAR,
+    )
+    codes = np.append(codes, _GIF_END)
+    return codes, np.full(len(codes), 9, np.int64)
+
+
+def _gif_lzw(pixels: np.ndarray) -> bytes:
+    """ LZW data of pixels split into sub-blocks. """
+
+    pixels = pixels.ravel()
+    codes, widths = _gif_run_codes(pixels)
+    literals = 9 * (len(pixels) + -(-len(pixels) // _GIF_LITERALS) + 1)
+    if widths.sum() > literals:
+        codes, widths = _gif_literal_codes(pixels)
+
+    # Codes are packed starting from the least significant bit.
+    ends = np.cumsum(widths)
+    bits = np.zeros(int(ends[-1]), np.uint8)
+    for bit in range(int(widths.max())):
+        mask = widths > bit
+        bits[(ends - widths)[mask] + bit] = codes[mask] >> bit & 1
+    data = np.packbits(bits, bitorder="little")
+
+    # Data is split into sub-blocks of at most 255 bytes.
+    full = len(data) // 255
+    blocks = np.empty((full, 256), np.uint8)
+    blocks[:, 0] = 255
+    blocks[:, 1:] = data[:full * 255].reshape(full, 255)
+    tail = data[full * 255:]
+
+    return blocks.tobytes() + bytes((len(tail),)) + tail.tobytes() \
+        + (b"\x00" if len(tail) else b"")
+
+
+class GifWriter:
+    """ Writes frames to animated GIF. Only rectangle of pixels changed
+        since previous frame is written, the rest is kept from it.
+    """
+
+    def __init__(
+        self, path: str, width: int, height: int, palette: np.ndarray,
+        fps: float = 25,
+    ):
+        self.width = width
+        self.height = height
+        # Delay between frames in hundredths of second.
+        self.delay = max(round(100 / fps), 1)
+        self.frames = 0
+        self._previous: Optional[np.ndarray] = None
+
+        self._file = open(path, "wb")
+        self._file.write(b"GIF89a")
+        # Global palette of 256 colors.
+        self._file.write(struct.pack("<HHBBB", width, height, 0xF7, 0, 0))
+        self._file.write(palette.tobytes())
+        # Endless loop.
+        self._file.write(
+            b"\x21\xFF\x0BNETSCAPE2.0\x03\x01" + struct.pack("<H", 0)
+            + b"\x00"
+        )
+
+    def write(self, pixels: np.ndarray) -> None:
+        """ Write next frame. """
+
+        if self._previous is None:
+            top, left, bottom, right = 0, 0, self.height, self.width
+        else:
+            changed = pixels != self._previous
+            rows = np.flatnonzero(changed.any(axis=1))
+            cols = np.flatnonzero(changed.any(axis=0))
+            if len(rows):
+                top, bottom = rows[0], rows[-1] + 1
+                left, right = cols[0], cols[-1] + 1
+            else:
+                # Frame must have some pixels, it only extends delay.
+                top, left, bottom, right = 0, 0, 1, 1
+        self._previous = pixels.copy()
+
+        # Graphic control: previous frame is kept under this one.
+        self._file.write(
+            b"\x21\xF9\x04" + struct.pack("<BHBB", 0x04, self.delay, 0, 0)
+        )
+        self._file.write(b"\x2C" + struct.pack(
+            "<HHHHB", left, top, right - left, bottom - top, 0
+        ))
+        self._file.write(bytes((8,)))
+        self._file.write(_gif_lzw(pixels[top:bottom, left:right]))
+        self.frames += 1
+
+    def close(self) -> None:
+        """ Finish and close file. """
+
+        if self._file is None:
+            return
+        self._file.write(b"\x3B")
+        self._file.close()
+        self._file = None
+
+
+def open_writer(
+    path: str, width: int, height: int, palette: Optional[np.ndarray] = None,
+    fps: float = 25,
+):
+    """ GifWriter if path ends with .gif, otherwise PngWriter with
+        path as pattern of frames.
+    """
+
+    palette = make_palette() if palette is None else palette
+    if path.lower().endswith(".gif"):
+        return GifWriter(path, width, height, palette, fps)
+    return PngWriter(path, palette)
+
+
+class Exporter:
+    """ Renders every n-th generation of engine to writer. View is fitted
+        to pattern at the first frame, or at every frame if refit.
+    """
+
+    def __init__(
+        self, writer, rasterizer: Rasterizer, every: int = 1,
+        side_scale: float = 1.2, refit: bool = False,
+    ):
+        self.writer = writer
+        self.rasterizer = rasterizer
+        self.every = every
+        self.side_scale = side_scale
+        self.refit = refit
+        self.view_matrix: Optional[np.matrix] = None
+
+    def __call__(self, cells, generation: int) -> None:
+        """ Export generation of engine, if it's time to. """
+
+        if generation % self.every:
+            return
+
+        if self.view_matrix is None or self.refit:
+            self.view_matrix = fit_view_matrix(
+                cells.bounding_box, self.side_scale
+            )
+        self.writer.write(
+            self.rasterizer.render(cells.live_cells(), self.view_matrix)
+        )
+
+    def close(self) -> None:
+        """ Finish writer. """
+        self.writer.close()
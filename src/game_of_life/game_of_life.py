@@ -2,33 +2,264 @@
 
 import time
 import threading
-
-import numpy as np
+from typing import Optional
 
 import globals
-from . import Cells, Renderer
-from utils import MutexVar, PeriodicLoop
+from . import Renderer
+from .engine import (
+    Engine, EnginePolicy, create_engine, create_like, convert_engine,
+)
+from .parallel import ParallelCells
+from .snapshot import Snapshot
+from .precompute import Precompute
+from .cycles import REHASH_INTERVAL, CycleDetector, fast_forward
+from .history import History
+from .view import fit_view_matrix
+from .packed_state import state_to_keys
+from .checkpoint import load_checkpoint, save_checkpoint_async
+from utils import MutexVar, AdaptiveLoop
 
 
 class GameOfLife:
-    """ Wrapper class over Cells and Renderer. """
+    """ Wrapper class over engine and Renderer. """
+
+    def __init__(
+        self, cells: Engine, renderer: Renderer, processes: int = 1,
+        precompute: int = 0, policy: Optional[EnginePolicy] = None,
+    ):
+        """ processes: if greater than 1, cells are stepped in parallel
+            by that count of worker processes.
+            precompute: if positive, generations are computed ahead
+            by background process, at most that count of them,
+            and game plays them back. It can't be combined with
+            processes greater than 1.
+            policy: if given, engine is switched to one it chooses
+            as pattern evolves.
+        """
+
+        if processes > 1 and precompute:
+            raise ValueError("ParallelCells can't be precomputed.")
+
+        if processes > 1:
+            cells = ParallelCells(cells.current_state, cells.rule, processes)
+            renderer.cells = cells
 
-    def __init__(self, cells: Cells, renderer: Renderer):
         self.cells = MutexVar(cells)
         self.renderer = renderer
         self.should_update = MutexVar(False)
+        self.generation = 0
+        self.snapshots = renderer.snapshots
+
+        # Published generations are recorded for rewinding.
+        self.history = History()
+        self.__publish(Snapshot.of(cells, self.generation))
 
-        self.updater = PeriodicLoop(0.2, self.update_loop)
+        # Guards cells and generation, which are replaced on seek.
+        self.lock = threading.Lock()
+
+        self.precompute = precompute
+        self.policy = policy
+        self.pipeline = Precompute(cells, precompute, policy=policy) \
+            if precompute else None
+
+        # Once cycle is detected, generations are fast-forwarded
+        # instead of being computed.
+        self.cycles = CycleDetector(interval=REHASH_INTERVAL)
+        self.cycles.observe(cells, self.generation)
+
+        self.updater = AdaptiveLoop(5, globals.FRAME_PERIOD, self.update_loop)
         self.updater.daemon = True
 
         self.__create_threads()
 
-    def update_loop(self) -> None:
-        """ Loop for updating game of life cells. """
+    def update_loop(self, count: int = 1) -> int:
+        """ Loop for updating game of life cells. Advances cells by count
+            generations, but publishes only the last one, since
+            intermediate ones wouldn't be displayed anyway.
+            Returns count of generations advanced.
+        """
+
+        if not self.should_update.inner:
+            return 0
+
+        with self.lock:
+            return self.__update(count)
+
+    def __update(self, count: int) -> int:
+        if self.pipeline is not None:
+            snapshot = self.pipeline.take(count)
+            if snapshot is None:
+                return 0
+
+            count = snapshot.generation - self.generation
+            self.generation = snapshot.generation
+            self.__publish(snapshot)
+            return count
+
+        cells = self.cells.inner
+        target = self.generation + count
+        while self.generation < target and self.cycles.cycle is None:
+            if self.policy is None:
+                cells.step()
+            else:
+                cells = self.policy.step(cells, self.generation)
+            self.generation += 1
+            self.cycles.observe(cells, self.generation)
+
+        if cells is not self.cells.inner:
+            self.cells.inner = cells
+            self.renderer.cells = cells
+
+        cycle = self.cycles.cycle
+        latest = self.snapshots.latest
+        if cycle is not None and cycle.is_still:
+            # Engine isn't stepped, but its generation is kept in step
+            # with game's one, since it's carried over to new engines.
+            cells.generation += target - self.generation
+            self.generation = target
+            if latest.generation >= cycle.start:
+                # Cells are the same, so snapshot is reused.
+                self.snapshots.publish(latest._replace(generation=target))
+            else:
+                self.__publish(Snapshot.of(cells, target))
+            return count
+
+        if self.generation < target:
+            cells, self.generation = fast_forward(
+                cells, cycle, self.generation, target
+            )
+            if cells is not self.cells.inner:
+                self.cells.inner = cells
+                self.renderer.cells = cells
+            if self.generation < target:
+                # Hashes collided, state doesn't really repeat.
+                self.cycles.reset()
+                self.cycles.observe(cells, self.generation)
+
+        self.__publish(Snapshot.of(cells, self.generation))
+        return count - (target - self.generation)
+
+    def __publish(self, snapshot: Snapshot) -> None:
+        self.snapshots.publish(snapshot)
+        self.history.record(snapshot.generation, state_to_keys(snapshot.cells))
+
+    @property
+    def cycle(self):
+        """ Cycle of pattern (period and displacement) if detected. """
+
+        if self.pipeline is not None:
+            return self.pipeline.cycle
+        return self.cycles.cycle
+
+    def set_cells(self, cells: Engine) -> None:
+        """ Replace game's cells, e.g. to restart it. """
+
+        with self.lock:
+            old = self.cells.inner
+            self.history.clear()
+            self.__replace_cells(cells, 0)
 
-        if self.should_update.inner:
-            self.cells.inner.step()
-            self.renderer.should_update_instance_vbo.inner = True
+            close = getattr(old, "close", None)
+            if close is not None and old is not cells:
+                close()
+
+    def set_engine(self, name: str) -> None:
+        """ Switch to engine registered with given name, keeping game
+            at the same generation.
+        """
+
+        with self.lock:
+            old = self.cells.inner
+            if self.pipeline is None:
+                cells = convert_engine(old, name)
+                self.cells.inner = cells
+                self.renderer.cells = cells
+                return
+
+            # Cells are stepped by pipeline, so it's restarted from
+            # the latest played generation.
+            snapshot = self.snapshots.latest
+            cells = create_engine(name, snapshot.cells, old.rule)
+            cells.generation = snapshot.generation
+            self.__replace_cells(cells, snapshot.generation, snapshot)
+
+            close = getattr(old, "close", None)
+            if close is not None:
+                close()
+
+    def seek(self, generation: int) -> int:
+        """ Return game to the latest recorded generation not after given
+            one (or the oldest recorded). Returns generation game is at.
+        """
+
+        with self.lock:
+            found = self.history.seek(max(generation, self.history.first))
+            if found is None or found[0] == self.generation:
+                return self.generation
+
+            generation, lived_cells = found
+            old = self.cells.inner
+            cells = create_like(old, lived_cells)
+            cells.generation = generation
+            self.__replace_cells(cells, generation)
+
+            close = getattr(old, "close", None)
+            if close is not None:
+                close()
+
+            return generation
+
+    def save(self, path: str) -> threading.Thread:
+        """ Save the latest published generation to checkpoint. It's
+            written by returned background thread, and game goes on.
+        """
+
+        snapshot = self.snapshots.latest
+        return save_checkpoint_async(
+            path, snapshot.cells, self.cells.inner.rule,
+            snapshot.generation, snapshot.bounding_box,
+        )
+
+    def load(self, path: str) -> None:
+        """ Resume game from checkpoint with the same engine type. """
+
+        checkpoint = load_checkpoint(path)
+        with self.lock:
+            old = self.cells.inner
+            cells = create_like(old, checkpoint.cells, checkpoint.rule)
+            cells.generation = checkpoint.generation
+            self.history.clear()
+            # Mapped cells are rendered as is, without copying.
+            self.__replace_cells(cells, checkpoint.generation, Snapshot(
+                checkpoint.generation, checkpoint.cells,
+                checkpoint.bounding_box,
+            ))
+
+            close = getattr(old, "close", None)
+            if close is not None:
+                close()
+
+    def rewind(self, count: int) -> int:
+        """ Go count generations back. Returns generation game is at. """
+        return self.seek(self.generation - count)
+
+    def __replace_cells(
+        self, cells: Engine, generation: int,
+        snapshot: Optional[Snapshot] = None,
+    ) -> None:
+        self.cells.inner = cells
+        self.renderer.cells = cells
+        self.generation = generation
+        self.__publish(snapshot or Snapshot.of(cells, generation))
+        self.cycles.reset()
+        self.cycles.observe(cells, generation)
+
+        if self.pipeline is not None:
+            self.pipeline.close()
+            self.pipeline = Precompute(
+                cells, self.precompute, generation=generation,
+                policy=self.policy,
+            )
 
     def toggle(self) -> None:
         """ Toggle game's updating. """
@@ -55,18 +286,9 @@ class GameOfLife:
     def fit_view(self, side_scale: float) -> None:
         """ Fit current view matrix to game's current state. """
 
-        bnd_box = self.cells.inner.bounding_box
-
-        a = side_scale * max(bnd_box[2] - bnd_box[0], bnd_box[3] - bnd_box[1])
-        t_x = (bnd_box[2] + bnd_box[0] - a) / 2
-        t_y = (bnd_box[3] + bnd_box[1] - a) / 2
-
-        self.renderer.view_matrix = np.matrix((
-            (1/a, 0, 0, -t_x/a),
-            (0, 1/a, 0, -t_y/a),
-            (0, 0, 1, 0),
-            (0, 0, 0, 1),
-        ), np.float32)
+        self.renderer.view_matrix = fit_view_matrix(
+            self.snapshots.latest.bounding_box, side_scale
+        )
 
     def __create_threads(self) -> None:
         self.update_thread = threading.Thread(
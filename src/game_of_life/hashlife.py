@@ -0,0 +1,366 @@
+""" HashLife engine: game of life on hash-consed quadtree with memoized
+    results, so that repetitive patterns can be advanced by huge jumps.
+"""
+
+from typing import Optional, Iterable, Iterator
+
+import numpy as np
+
+from module_typing import GameState, Pos
+from .rules import Rule, CONWAY
+from .packed_state import cells_to_array
+
+
+class _Node:
+    """ Canonical quadtree node. Nodes are created only by HashLife.__join,
+        therefore equal subtrees are the same object and identity hash
+        and comparison can be used.
+    """
+
+    __slots__ = ("level", "nw", "ne", "sw", "se", "population")
+
+    def __init__(self, level, nw, ne, sw, se, population):
+        self.level = level
+        self.nw = nw
+        self.ne = ne
+        self.sw = sw
+        self.se = se
+        self.population = population
+
+
+# Leaves (level 0), i.e. single dead and alive cells.
+_DEAD = _Node(0, None, None, None, None, 0)
+_ALIVE = _Node(0, None, None, None, None, 1)
+
+# Level of nodes, which cells are cached as arrays for live_cells.
+_LEAF_LEVEL = 3
+
+
+class HashLife:
+    """ Game of life engine based on Gosper's HashLife algorithm.
+        Has the same interface as Cells, but step can advance by
+        many generations at once.
+    """
+
+    def __init__(
+        self,
+        lived_cells: Optional[Iterable[Pos]] = None,
+        rule: Rule = CONWAY,
+        max_nodes: int = 1_000_000,
+    ):
+        """ Give only cells that alive and other is dead.
+            max_nodes: size of node cache after which garbage
+            collection is done, even in the middle of step.
+        """
+
+        self.rule = rule
+        self.generation = 0
+        self.max_nodes = max_nodes
+
+        # Hash-consing table (children -> node) and memoized results
+        # ((node, j) -> node advanced by 2^j generations).
+        self._nodes: dict[tuple, _Node] = {}
+        self._results: dict[tuple[_Node, int], _Node] = {}
+        self._empty: list[_Node] = [_DEAD]
+        # Cells of leaf nodes relative to their corners.
+        self._leaf_cells: dict[_Node, np.ndarray] = {}
+        # Size of node cache, at which garbage is collected. It's doubled
+        # by every collection during jump, so that jump, which needs
+        # more nodes than max_nodes, doesn't collect all the time.
+        self._gc_limit = max_nodes
+
+        self.__build(cells_to_array(lived_cells).tolist())
+
+    @property
+    def current_state(self) -> GameState:
+        """ Set of alive cells. """
+
+        cells = self.live_cells()
+        return set(zip(cells[:, 0].tolist(), cells[:, 1].tolist()))
+
+    def live_cells(self) -> np.ndarray:
+        """ Return (N, 2) array of alive cells. """
+
+        if self._cells is None:
+            self._cells = self.__emit_cells()
+            # Array is cached, so that it mustn't be changed.
+            self._cells.flags.writeable = False
+        return self._cells
+
+    @property
+    def bounding_box(self) -> tuple[int, int, int, int]:
+        """ Bounding box of alive cells as (min_x, min_y, max_x, max_y). """
+
+        if self._bounding_box is None:
+            cells = self.live_cells()
+            if len(cells):
+                min_x, min_y = cells.min(axis=0).tolist()
+                max_x, max_y = cells.max(axis=0).tolist()
+                self._bounding_box = (min_x, min_y, max_x, max_y)
+            else:
+                self._bounding_box = (0, 0, 0, 0)
+        return self._bounding_box
+
+    @property
+    def population(self) -> int:
+        """ Count of alive cells. """
+        return self._root.population
+
+    def step(self, n: int = 1) -> None:
+        """ Do next n iterations of game. """
+
+        j = 0
+        while n:
+            if n & 1:
+                self.jump(j)
+            n >>= 1
+            j += 1
+
+    def jump(self, k: int) -> None:
+        """ Do 2^k iterations of game at once. """
+
+        # Pattern must be placed at center with enough space around it,
+        # so that it can't escape the result node in 2^k generations.
+        while self._root.level < k + 2 or not self.__is_padded(self._root):
+            self.__expand()
+        self.__expand()
+
+        self._gc_limit = self.max_nodes
+        root = self._root
+        half = 1 << (root.level - 2)
+        self._root = self.__successor(root, k)
+        self._origin = (self._origin[0] + half, self._origin[1] + half)
+
+        self.__shrink()
+        self._cells = None
+        self.generation += 1 << k
+        self._bounding_box = None
+
+        # Limit was raised during jump, so cache is brought back
+        # under max_nodes after it.
+        if len(self._nodes) > self.max_nodes:
+            self.collect_garbage()
+
+    def collect_garbage(self) -> None:
+        """ Drop all cached nodes and results that don't belong
+            to current generation.
+        """
+
+        self._nodes.clear()
+        self._results.clear()
+        self._leaf_cells.clear()
+
+        stack = [self._root, *self._empty[1:]]
+        seen = set()
+        while stack:
+            node = stack.pop()
+            if node.level == 0 or id(node) in seen:
+                continue
+            seen.add(id(node))
+            self._nodes[(node.nw, node.ne, node.sw, node.se)] = node
+            stack.extend((node.nw, node.ne, node.sw, node.se))
+
+    def __build(self, cells: list[Pos]) -> None:
+        if cells:
+            min_x = min(x for x, _ in cells)
+            min_y = min(y for _, y in cells)
+            side = max(
+                max(x for x, _ in cells) - min_x,
+                max(y for _, y in cells) - min_y,
+            ) + 1
+        else:
+            min_x = min_y = 0
+            side = 1
+
+        level = max(3, (side - 1).bit_length())
+        self._origin = (min_x, min_y)
+        self._root = self.__build_node(
+            [(x - min_x, y - min_y) for x, y in cells], level
+        )
+        self._cells = None
+        self._bounding_box = None
+
+    def __build_node(self, cells: list[Pos], level: int) -> _Node:
+        if not cells:
+            return self.__empty(level)
+        if level == 0:
+            return _ALIVE
+
+        half = 1 << (level - 1)
+        quads: tuple[list, list, list, list] = ([], [], [], [])
+        for x, y in cells:
+            quads[(y >= half) << 1 | (x >= half)].append(
+                (x - half * (x >= half), y - half * (y >= half))
+            )
+
+        return self.__join(*(self.__build_node(q, level - 1) for q in quads))
+
+    def __emit_cells(self) -> np.ndarray:
+        """ Write cells into array of population size. Tree is walked
+            down to leaf nodes only, which cells are cached.
+        """
+
+        cells = np.empty((self._root.population, 2), np.int64)
+        start = 0
+        stack = [(self._root, *self._origin)]
+        while stack:
+            node, x, y = stack.pop()
+            if node.population == 0:
+                continue
+
+            if node.level <= _LEAF_LEVEL:
+                offsets = self._leaf_cells.get(node)
+                if offsets is None:
+                    offsets = np.array(
+                        list(self.__iter_cells(node, 0, 0)), np.int64
+                    ).reshape(-1, 2)
+                    self._leaf_cells[node] = offsets
+                end = start + len(offsets)
+                np.add(offsets, (x, y), out=cells[start:end])
+                start = end
+                continue
+
+            half = 1 << (node.level - 1)
+            stack.extend((
+                (node.nw, x, y), (node.ne, x + half, y),
+                (node.sw, x, y + half), (node.se, x + half, y + half),
+            ))
+
+        return cells
+
+    def __iter_cells(self, node: _Node, x: int, y: int) -> Iterator[Pos]:
+        if node.population == 0:
+            return
+        if node.level == 0:
+            yield (x, y)
+            return
+
+        half = 1 << (node.level - 1)
+        yield from self.__iter_cells(node.nw, x, y)
+        yield from self.__iter_cells(node.ne, x + half, y)
+        yield from self.__iter_cells(node.sw, x, y + half)
+        yield from self.__iter_cells(node.se, x + half, y + half)
+
+    def __join(self, nw: _Node, ne: _Node, sw: _Node, se: _Node) -> _Node:
+        key = (nw, ne, sw, se)
+        node = self._nodes.get(key)
+        if node is None:
+            node = _Node(
+                nw.level + 1, nw, ne, sw, se,
+                nw.population + ne.population + sw.population + se.population,
+            )
+            self._nodes[key] = node
+        return node
+
+    def __empty(self, level: int) -> _Node:
+        while len(self._empty) <= level:
+            e = self._empty[-1]
+            self._empty.append(self.__join(e, e, e, e))
+        return self._empty[level]
+
+    def __center(self, node: _Node) -> _Node:
+        return self.__join(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+    def __is_padded(self, node: _Node) -> bool:
+        return (
+            node.level >= 3
+            and self.__center(node).population == node.population
+        )
+
+    def __expand(self) -> None:
+        root = self._root
+        e = self.__empty(root.level - 1)
+        self._root = self.__join(
+            self.__join(e, e, e, root.nw),
+            self.__join(e, e, root.ne, e),
+            self.__join(e, root.sw, e, e),
+            self.__join(root.se, e, e, e),
+        )
+
+        half = 1 << (root.level - 1)
+        self._origin = (self._origin[0] - half, self._origin[1] - half)
+
+    def __shrink(self) -> None:
+        while self.__is_padded(self._root) and self._root.level > 3:
+            quarter = 1 << (self._root.level - 2)
+            self._root = self.__center(self._root)
+            self._origin = (
+                self._origin[0] + quarter, self._origin[1] + quarter
+            )
+
+    def __successor(self, node: _Node, j: int) -> _Node:
+        """ Return center of node (level - 1) advanced by 2^j generations,
+            where j is clamped to node.level - 2.
+        """
+
+        j = min(j, node.level - 2)
+        key = (node, j)
+        result = self._results.get(key)
+        if result is not None:
+            return result
+
+        # Nodes of unfinished recursion that are dropped from cache
+        # stay alive, they are just no longer shared.
+        if len(self._nodes) > self._gc_limit:
+            self.collect_garbage()
+            self._gc_limit *= 2
+
+        if node.population == 0:
+            result = self.__empty(node.level - 1)
+        elif node.level == 2:
+            result = self.__life_4x4(node)
+        else:
+            result = self.__successor_recursive(node, j)
+
+        self._results[key] = result
+        return result
+
+    def __successor_recursive(self, node: _Node, j: int) -> _Node:
+        nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+        join = self.__join
+
+        # Nine overlapping subnodes of level - 1.
+        subnodes = (
+            nw, join(nw.ne, ne.nw, nw.se, ne.sw), ne,
+            join(nw.sw, nw.se, sw.nw, sw.ne),
+            join(nw.se, ne.sw, sw.ne, se.nw),
+            join(ne.sw, ne.se, se.nw, se.ne),
+            sw, join(sw.ne, se.nw, sw.se, se.sw), se,
+        )
+
+        # At full speed both halves advance by 2^(level - 3) generations,
+        # otherwise first half just takes centers.
+        if j == node.level - 2:
+            c = [self.__successor(sub, j) for sub in subnodes]
+        else:
+            c = [self.__center(sub) for sub in subnodes]
+
+        return join(
+            self.__successor(join(c[0], c[1], c[3], c[4]), j),
+            self.__successor(join(c[1], c[2], c[4], c[5]), j),
+            self.__successor(join(c[3], c[4], c[6], c[7]), j),
+            self.__successor(join(c[4], c[5], c[7], c[8]), j),
+        )
+
+    def __life_4x4(self, node: _Node) -> _Node:
+        # Grid of 4x4 cells indexed [y][x].
+        grid = [[0] * 4 for _ in range(4)]
+        for qy, row in enumerate(((node.nw, node.ne), (node.sw, node.se))):
+            for qx, quad in enumerate(row):
+                grid[2*qy][2*qx] = quad.nw.population
+                grid[2*qy][2*qx + 1] = quad.ne.population
+                grid[2*qy + 1][2*qx] = quad.sw.population
+                grid[2*qy + 1][2*qx + 1] = quad.se.population
+
+        cells = []
+        for y in (1, 2):
+            for x in (1, 2):
+                neighs = sum(
+                    grid[y + dy][x + dx]
+                    for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+                ) - grid[y][x]
+
+                alive = self.rule.table[grid[y][x], neighs]
+                cells.append(_ALIVE if alive else _DEAD)
+
+        return self.__join(*cells)
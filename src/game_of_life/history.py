@@ -0,0 +1,148 @@
+""" History of game states for rewinding. States are kept as periodic
+    keyframes (full states) and deltas between recorded generations,
+    packed and optionally compressed, within memory budget.
+"""
+
+import bisect
+import zlib
+from typing import Optional
+
+import numpy as np
+
+from .packed_state import unpack
+
+
+def _encode(keys: np.ndarray, compress: bool) -> bytes:
+    """ Encode sorted keys as differences between neighbor keys,
+        which are small and compress well.
+    """
+
+    data = np.diff(keys, prepend=np.int64(0)).tobytes()
+    return zlib.compress(data, 1) if compress else data
+
+
+def _decode(data: bytes, compress: bool) -> np.ndarray:
+    if compress:
+        data = zlib.decompress(data)
+    return np.cumsum(np.frombuffer(data, np.int64))
+
+
+class _Segment:
+    """ Keyframe and deltas of generations after it. Delta is set of
+        cells that were born or died, so that state is XORed with it.
+    """
+
+    __slots__ = ("generations", "keyframe", "deltas", "nbytes")
+
+    def __init__(self, generation: int, keyframe: bytes):
+        self.generations = [generation]
+        self.keyframe = keyframe
+        self.deltas: list[bytes] = []
+        self.nbytes = len(keyframe)
+
+
+class History:
+    """ Ring buffer of recorded generations. When memory budget
+        is exceeded, the oldest keyframe is dropped with its deltas.
+    """
+
+    def __init__(
+        self, budget: int = 64 << 20, keyframe_interval: int = 64,
+        compress: bool = True,
+    ):
+        """ budget: maximum size of stored data in bytes.
+            keyframe_interval: count of recorded generations between
+            keyframes, so that seek replays at most that count of deltas.
+            compress: if True, data is compressed by zlib.
+        """
+
+        self.budget = budget
+        self.keyframe_interval = keyframe_interval
+        self.compress = compress
+
+        self._segments: list[_Segment] = []
+        self._nbytes = 0
+        self._last_keys: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return sum(len(segment.generations) for segment in self._segments)
+
+    @property
+    def nbytes(self) -> int:
+        """ Size of stored data in bytes. """
+        return self._nbytes
+
+    @property
+    def first(self) -> Optional[int]:
+        """ The oldest recorded generation. """
+        return self._segments[0].generations[0] if self._segments else None
+
+    @property
+    def last(self) -> Optional[int]:
+        """ The latest recorded generation. """
+        return self._segments[-1].generations[-1] if self._segments else None
+
+    def clear(self) -> None:
+        """ Forget all generations. """
+
+        self._segments.clear()
+        self._nbytes = 0
+        self._last_keys = None
+
+    def record(self, generation: int, keys: np.ndarray) -> None:
+        """ Record state given by sorted packed keys. Generations not after
+            the latest recorded one are ignored, since game is determined
+            and they are recorded already.
+        """
+
+        last = self.last
+        if last is not None and generation <= last:
+            return
+
+        segment = self._segments[-1] if self._segments else None
+        delta = None
+        if segment is not None \
+                and len(segment.generations) < self.keyframe_interval:
+            delta = _encode(
+                np.setxor1d(self._last_keys, keys, assume_unique=True),
+                self.compress,
+            )
+            # Keyframe is cheaper, when deltas outgrow it (e.g. soups).
+            if segment.nbytes - len(segment.keyframe) + len(delta) \
+                    > len(segment.keyframe):
+                delta = None
+
+        if delta is None:
+            segment = _Segment(generation, _encode(keys, self.compress))
+            self._segments.append(segment)
+            self._nbytes += segment.nbytes
+        else:
+            segment.generations.append(generation)
+            segment.deltas.append(delta)
+            segment.nbytes += len(delta)
+            self._nbytes += len(delta)
+
+        self._last_keys = keys
+        while self._nbytes > self.budget and len(self._segments) > 1:
+            self._nbytes -= self._segments.pop(0).nbytes
+
+    def seek(self, generation: int) -> Optional[tuple[int, np.ndarray]]:
+        """ Return the latest recorded generation not after given one
+            and (N, 2) array of its cells, or None if there's no such.
+        """
+
+        starts = [segment.generations[0] for segment in self._segments]
+        index = bisect.bisect_right(starts, generation) - 1
+        if index < 0:
+            return None
+
+        segment = self._segments[index]
+        count = bisect.bisect_right(segment.generations, generation)
+
+        keys = _decode(segment.keyframe, self.compress)
+        for delta in segment.deltas[:count - 1]:
+            keys = np.setxor1d(
+                keys, _decode(delta, self.compress), assume_unique=True
+            )
+
+        return segment.generations[count - 1], unpack(keys)
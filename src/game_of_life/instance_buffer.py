@@ -0,0 +1,115 @@
+""" CPU side of renderer's instance buffer. Keeps offsets of cells
+    packed without holes and tracks which ranges of them changed,
+    so that only those ranges are uploaded to GPU.
+"""
+
+from typing import Collection
+
+import numpy as np
+
+from module_typing import Pos
+from .packed_state import unpack, state_to_keys, unique_keys
+
+OFFSET_SIZE = 2 * np.dtype(np.float32).itemsize
+
+
+def _to_ranges(slots: np.ndarray) -> list[tuple[int, int]]:
+    """ Merge slots into sorted list of [start, end) ranges. """
+
+    slots = unique_keys(slots)
+    if not len(slots):
+        return []
+
+    breaks = np.flatnonzero(np.diff(slots) != 1) + 1
+    starts = slots[np.concatenate(((0,), breaks))]
+    ends = slots[np.concatenate((breaks - 1, (len(slots) - 1,)))] + 1
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+class InstanceBuffer:
+    """ Growable array of cells offsets with the same layout as GPU
+        instance buffer. Dead cells are replaced by last ones, so that
+        first count offsets are always alive cells.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.count = 0
+        self.offsets = np.empty((capacity, 2), np.float32)
+
+        # Ranges of slots changed by last update.
+        self.dirty_ranges: list[tuple[int, int]] = []
+
+        self._keys = np.empty(0, np.int64)
+        self._slot_keys = np.empty(capacity, np.int64)
+        self._slots: dict[int, int] = {}
+
+    @property
+    def capacity(self) -> int:
+        """ Count of offsets buffer can hold without reallocation. """
+        return len(self.offsets)
+
+    def update(self, state: Collection[Pos]) -> list[tuple[int, int]]:
+        """ Update offsets to given state. Returns ranges of slots
+            that must be uploaded.
+        """
+
+        keys = state_to_keys(state)
+        births = np.setdiff1d(keys, self._keys, assume_unique=True)
+        deaths = np.setdiff1d(self._keys, keys, assume_unique=True)
+        self._keys = keys
+
+        dirty = [self.__remove(deaths), self.__append(births)]
+        self.dirty_ranges = _to_ranges(np.concatenate(dirty))
+
+        return self.dirty_ranges
+
+    def __remove(self, keys: np.ndarray) -> np.ndarray:
+        """ Remove cells and fill holes with cells from end.
+            Returns changed slots.
+        """
+
+        if not len(keys):
+            return np.empty(0, np.int64)
+
+        holes = np.array([self._slots.pop(k) for k in keys.tolist()])
+        new_count = self.count - len(holes)
+
+        # Alive cells from tail are moved to holes before new count.
+        tail = np.arange(new_count, self.count)
+        movers = tail[~np.isin(tail, holes)]
+        holes = holes[holes < new_count]
+
+        self.offsets[holes] = self.offsets[movers]
+        self._slot_keys[holes] = self._slot_keys[movers]
+        self._slots.update(zip(
+            self._slot_keys[holes].tolist(), holes.tolist()
+        ))
+
+        self.count = new_count
+        return holes
+
+    def __append(self, keys: np.ndarray) -> np.ndarray:
+        """ Append cells to end. Returns changed slots. """
+
+        new_count = self.count + len(keys)
+        if new_count > self.capacity:
+            self.__grow(new_count)
+
+        slots = np.arange(self.count, new_count)
+        self.offsets[slots] = unpack(keys)
+        self._slot_keys[slots] = keys
+        self._slots.update(zip(keys.tolist(), slots.tolist()))
+
+        self.count = new_count
+        return slots
+
+    def __grow(self, min_capacity: int) -> None:
+        capacity = max(min_capacity, 2*self.capacity)
+
+        offsets = np.empty((capacity, 2), np.float32)
+        offsets[:self.count] = self.offsets[:self.count]
+        slot_keys = np.empty(capacity, np.int64)
+        slot_keys[:self.count] = self._slot_keys[:self.count]
+
+        self.offsets = offsets
+        self._slot_keys = slot_keys
@@ -0,0 +1,375 @@
+""" Out-of-core game of life engine, which keeps universe as bit-packed
+    tiles in memory-mapped file, so that pattern can outgrow RAM.
+"""
+
+import os
+import tempfile
+import weakref
+from collections import OrderedDict
+from typing import Optional, Iterable
+
+import numpy as np
+
+from module_typing import GameState, Pos
+from .rules import Rule, CONWAY
+from .packed_state import cells_to_array, pack, unpack, unique_keys
+from .bitpacked import (
+    WORD_BITS, apply_rule, neighbors_count_bits, rows_cells,
+    _ONE, _POPCOUNT,
+)
+
+# Tile is square of 64x64 cells, one uint64 word per row.
+TILE_SIZE = WORD_BITS
+TILE_BYTES = TILE_SIZE * 8
+
+# Count of tiles stepped by one vectorized computation.
+CHUNK_TILES = 1024
+
+# Offsets of neighbor tiles (and tile itself) in packed keys,
+# row by row from north-west to south-east.
+_HALO_OFFSETS = pack(np.array([
+    (dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+])) - pack(np.zeros((1, 2)))
+
+
+def _tile_boxes(tiles: np.ndarray) -> np.ndarray:
+    """ Bounding boxes of cells of (N, 64) non-empty tiles relative
+        to their corners, as (N, 4) array of (x0, y0, x1, y1).
+    """
+
+    rows = tiles != 0
+    columns = np.unpackbits(
+        np.bitwise_or.reduce(tiles, axis=1).view(np.uint8).reshape(-1, 8),
+        axis=1, bitorder="little",
+    ).view(bool)
+    last = TILE_SIZE - 1
+
+    return np.stack((
+        columns.argmax(axis=1), rows.argmax(axis=1),
+        last - columns[:, ::-1].argmax(axis=1),
+        last - rows[:, ::-1].argmax(axis=1),
+    ), axis=1).astype(np.uint8)
+
+
+def _remove_file(file, path: str) -> None:
+    """ Close and remove file of tiles. It's called by finalizer,
+        so it mustn't refer to engine.
+    """
+
+    file.close()
+    os.remove(path)
+
+
+class MappedCells:
+    """ Game of life engine that stores 64x64 tiles in file mapped
+        to memory. Directory of tiles is kept in memory as sorted
+        array of packed tile keys with arrays of slots of file and
+        bounding boxes of tiles, 20 bytes per tile (of 512 bytes
+        tile takes in file), and recently used tiles are kept in LRU
+        cache. Population and bounding box are updated from changed
+        tiles, so they don't read the file.
+
+        Only tiles that changed last generation and their neighbors
+        are read, and only changed tiles are written. New tiles are
+        written into free slots and old ones are freed after step,
+        so that the file is never half-updated. Has the same interface
+        as Cells. File is removed by close, on exit from with block
+        or, at the latest, when engine is garbage collected.
+    """
+
+    def __init__(
+        self, lived_cells: Optional[Iterable[Pos]] = None,
+        rule: Rule = CONWAY, path: Optional[str] = None,
+        cache_tiles: int = 4096,
+    ):
+        """ Give only cells that alive and other is dead.
+            path: file to store tiles in, temporary file is created
+            by default. File is removed on close.
+            cache_tiles: count of tiles kept in memory.
+        """
+
+        self.rule = rule
+        self.generation = 0
+        self.cache_tiles = cache_tiles
+
+        if path is None:
+            fd, path = tempfile.mkstemp(suffix=".tiles")
+            os.close(fd)
+        self.path = path
+        self._file = open(path, "w+b")
+        self._finalizer = weakref.finalize(
+            self, _remove_file, self._file, path
+        )
+        self._map: Optional[np.memmap] = None
+        self._capacity = 0
+        self._free: list[int] = []
+        self._cache: OrderedDict[int, np.ndarray] = OrderedDict()
+
+        coords = cells_to_array(lived_cells)
+        tile_keys = pack(coords // TILE_SIZE)
+        order = np.argsort(tile_keys, kind="stable")
+        bounds = np.flatnonzero(np.diff(tile_keys[order])) + 1
+        parts = np.split(order, bounds) if len(order) else []
+        tiles = np.zeros((len(parts), TILE_SIZE), np.uint64)
+        for tile, part in zip(tiles, parts):
+            local = coords[part] % TILE_SIZE
+            np.bitwise_or.at(
+                tile, local[:, 1], _ONE << local[:, 0].astype(np.uint64)
+            )
+
+        # Directory: sorted packed keys of tiles, their slots in file
+        # and bounding boxes of their cells.
+        self._keys = unique_keys(tile_keys)
+        self._slots = np.array(
+            [self.__write(tile) for tile in tiles], np.int64
+        )
+        self._boxes = _tile_boxes(tiles)
+        self._population = int(
+            _POPCOUNT[tiles.view(np.uint8)].sum(dtype=np.int64)
+        )
+        self._bounding_box = None
+
+        # Keys of tiles that changed last generation.
+        self._active = self._keys
+
+        # Keys and XOR of old and new rows of tiles changed last
+        # generation, from which keys of changed cells are computed
+        # on demand.
+        self._last_step: Optional[tuple] = None
+        self._changes: Optional[np.ndarray] = None
+
+    def close(self) -> None:
+        """ Unmap and remove file of tiles. """
+
+        if self._file is None:
+            return
+
+        self._map = None
+        self._cache.clear()
+        self._file = None
+        self._finalizer()
+
+    def __enter__(self) -> "MappedCells":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def current_state(self) -> GameState:
+        """ Set of alive cells. """
+
+        cells = self.live_cells()
+        return set(zip(cells[:, 0].tolist(), cells[:, 1].tolist()))
+
+    def live_cells(self) -> np.ndarray:
+        """ Return (N, 2) array of alive cells. """
+
+        cells = [np.empty((0, 2), np.int64)]
+        origins = unpack(self._keys) * TILE_SIZE
+        for (x, y), slot in zip(origins.tolist(), self._slots.tolist()):
+            cells.append(rows_cells(
+                self.__read(slot).reshape(TILE_SIZE, 1), (x, y)
+            ))
+
+        return np.concatenate(cells)
+
+    @property
+    def bounding_box(self) -> tuple[int, int, int, int]:
+        """ Bounding box of alive cells as (min_x, min_y, max_x, max_y). """
+
+        if self._bounding_box is None:
+            self._bounding_box = self.__compute_bounding_box()
+        return self._bounding_box
+
+    @property
+    def population(self) -> int:
+        """ Count of alive cells. """
+        return self._population
+
+    @property
+    def changes(self) -> Optional[np.ndarray]:
+        """ Packed keys of cells born or died at last generation,
+            None before first generation.
+        """
+
+        if self._changes is None and self._last_step is not None:
+            keys, diffs = self._last_step
+            # Tiles are stacked into one column of words.
+            cells = rows_cells(diffs.reshape(-1, 1), (0, 0))
+            idx, cells[:, 1] = np.divmod(cells[:, 1], TILE_SIZE)
+            cells += unpack(keys)[idx] * TILE_SIZE
+            self._changes = pack(cells)
+        return self._changes
+
+    @property
+    def active_tiles(self) -> int:
+        """ Count of tiles that changed last generation. """
+        return len(self._active)
+
+    @property
+    def file_size(self) -> int:
+        """ Size of file of tiles in bytes. """
+        return self._capacity * TILE_BYTES
+
+    def step(self, n: int = 1) -> None:
+        """ Do next n iterations of game. """
+
+        for _ in range(n):
+            self.__step()
+        self.generation += n
+
+    def __step(self) -> None:
+
+        candidates = unique_keys(
+            (self._active[:, None] + _HALO_OFFSETS).ravel()
+        )
+
+        # Tiles are stepped by chunks (at least one, maybe empty one).
+        # New tiles are written into free slots at once, but directory
+        # is updated after all tiles are stepped, since neighbors must
+        # be old.
+        parts = []
+        for chunk in np.array_split(
+            candidates, -(-len(candidates) // CHUNK_TILES) or 1
+        ):
+            keys, tiles, diffs = self.__step_tiles(chunk)
+
+            # Old tiles are new ones with changed bits flipped back.
+            self._population += int(
+                _POPCOUNT[tiles.view(np.uint8)].sum(dtype=np.int64)
+                - _POPCOUNT[(tiles ^ diffs).view(np.uint8)].sum(
+                    dtype=np.int64
+                )
+            )
+
+            live = tiles.any(axis=1)
+            slots = [self.__write(tile) for tile in tiles[live]]
+            parts.append((
+                keys, live, np.array(slots, np.int64),
+                _tile_boxes(tiles[live]), diffs,
+            ))
+
+        keys, live, slots, boxes, diffs = (
+            np.concatenate(arrays) for arrays in zip(*parts)
+        )
+        self.__update_directory(keys, live, slots, boxes)
+
+        self._active = keys
+        if len(keys):
+            self._bounding_box = None
+        self._last_step = (keys, diffs)
+        self._changes = None
+
+    def __update_directory(
+        self, keys: np.ndarray, live: np.ndarray, slots: np.ndarray,
+        boxes: np.ndarray,
+    ) -> None:
+        """ Replace sorted tiles keys by new ones (only live ones are
+            kept) with given slots and boxes. Old slots are freed.
+        """
+
+        pos, found = self.__find(keys)
+        for slot in self._slots[pos[found]].tolist():
+            self._free.append(slot)
+            self._cache.pop(slot, None)
+
+        kept = np.ones(len(self._keys), bool)
+        kept[pos[found]] = False
+        old_keys = self._keys[kept]
+        at = np.searchsorted(old_keys, keys[live])
+
+        self._keys = np.insert(old_keys, at, keys[live])
+        self._slots = np.insert(self._slots[kept], at, slots)
+        self._boxes = np.insert(self._boxes[kept], at, boxes, axis=0)
+
+    def __find(self, keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """ Positions of tiles keys in directory and whether they
+            are there.
+        """
+
+        pos = np.searchsorted(self._keys, keys)
+        if not len(self._keys):
+            return pos, np.zeros(len(keys), bool)
+        pos = np.minimum(pos, len(self._keys) - 1)
+        return pos, self._keys[pos] == keys
+
+    def __step_tiles(self, keys: np.ndarray) -> tuple[np.ndarray, ...]:
+        """ Step given tiles, return keys, new rows and XOR of old and new
+            rows of changed ones.
+        """
+
+        # Every tile is stepped in block of 3 words (tile and halves
+        # of its west and east neighbors) by 66 rows (tile and rows
+        # of its north and south neighbors).
+        blocks = np.zeros((len(keys), TILE_SIZE + 2, 3), np.uint64)
+        pos, found = self.__find((keys[:, None] + _HALO_OFFSETS).ravel())
+        idx, neighbor = np.divmod(np.flatnonzero(found), 9)
+        dy, dx = np.divmod(neighbor, 3)
+        # Every tile is neighbor of up to 9 blocks, but it's read once.
+        slots, inverse = np.unique(
+            self._slots[pos[found]], return_inverse=True
+        )
+        tiles = np.array(
+            [self.__read(slot) for slot in slots.tolist()], np.uint64
+        ).reshape(-1, TILE_SIZE)[inverse]
+
+        north, south, middle = dy == 0, dy == 2, dy == 1
+        blocks[idx[north], 0, dx[north]] = tiles[north, -1]
+        blocks[idx[south], -1, dx[south]] = tiles[south, 0]
+        blocks[idx[middle], 1:-1, dx[middle]] = tiles[middle]
+
+        # Blocks are stacked, so that rows of one block see rows
+        # of another one only at halo rows, which are dropped.
+        rows = blocks.reshape(-1, 3)
+        new = apply_rule(self.rule, rows, neighbors_count_bits(rows))
+        new = new.reshape(blocks.shape)[:, 1:-1, 1]
+        old = blocks[:, 1:-1, 1]
+
+        diff = new ^ old
+        changed = np.flatnonzero(diff.any(axis=1))
+        return keys[changed], new[changed], diff[changed]
+
+    def __read(self, slot: int) -> np.ndarray:
+        tile = self._cache.get(slot)
+        if tile is not None:
+            self._cache.move_to_end(slot)
+            return tile
+
+        tile = np.array(self._map[slot])
+        self._cache[slot] = tile
+        if len(self._cache) > self.cache_tiles:
+            self._cache.popitem(last=False)
+        return tile
+
+    def __write(self, tile: np.ndarray) -> int:
+        """ Write tile into free slot, which is returned. """
+
+        if not self._free:
+            self.__grow()
+        slot = self._free.pop()
+        self._map[slot] = tile
+        return slot
+
+    def __grow(self) -> None:
+        """ Double capacity of file and remap it. """
+
+        capacity = max(2 * self._capacity, 64)
+        if self._map is not None:
+            self._map.flush()
+        self._file.truncate(capacity * TILE_BYTES)
+        self._map = np.memmap(
+            self._file, np.dtype("<u8"), "r+", shape=(capacity, TILE_SIZE)
+        )
+
+        self._free.extend(range(capacity - 1, self._capacity - 1, -1))
+        self._capacity = capacity
+
+    def __compute_bounding_box(self) -> tuple[int, int, int, int]:
+        if not len(self._keys):
+            return (0, 0, 0, 0)
+
+        origins = unpack(self._keys) * TILE_SIZE
+        mins = (origins + self._boxes[:, :2]).min(axis=0).tolist()
+        maxs = (origins + self._boxes[:, 2:]).max(axis=0).tolist()
+        return (*mins, *maxs)
@@ -0,0 +1,211 @@
+""" Compact representation of game state, where every alive cell
+    is packed into single int64 key.
+"""
+
+from collections.abc import Set
+from itertools import chain
+from typing import Collection, Iterable, Iterator, Optional
+
+import numpy as np
+
+from module_typing import Pos
+
+# Bias of x coordinate, so that it's stored in low 32 bits as unsigned.
+_X_BIAS = 1 << 31
+_LOW_MASK = (1 << 32) - 1
+
+_INT32 = np.iinfo(np.int32)
+
+
+def unique_keys(keys: np.ndarray) -> np.ndarray:
+    """ Sorted unique keys. Unlike np.unique, it always sorts, which is
+        much faster for big arrays of keys than hashing np.unique does
+        since numpy 2.3.
+    """
+
+    keys = np.sort(keys, axis=None)
+    if len(keys) < 2:
+        return keys
+
+    distinct = np.empty(len(keys), bool)
+    distinct[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=distinct[1:])
+    return keys[distinct]
+
+
+def unique_inverse(keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ Sorted unique keys and index of unique key for every key, like
+        np.unique(keys, return_inverse=True), but always by sorting.
+    """
+
+    order = np.argsort(keys, axis=None)
+    keys = keys.reshape(-1)[order]
+    distinct = np.empty(len(keys), bool)
+    distinct[:1] = True
+    np.not_equal(keys[1:], keys[:-1], out=distinct[1:])
+
+    inverse = np.empty(len(keys), np.intp)
+    inverse[order] = np.cumsum(distinct) - 1
+    return keys[distinct], inverse
+
+
+def pack(coords: np.ndarray) -> np.ndarray:
+    """ Pack (N, 2) array of cells coordinates into int64 keys.
+        Keys are ordered by y and then by x.
+        Coordinates must fit into int32.
+    """
+
+    coords = np.asarray(coords, np.int64).reshape(-1, 2)
+    if len(coords) and (
+        coords.min() < _INT32.min or coords.max() > _INT32.max
+    ):
+        raise ValueError("Cells coordinates must fit into int32.")
+
+    return (coords[:, 1] << 32) + (coords[:, 0] + _X_BIAS)
+
+
+def unpack(keys: np.ndarray) -> np.ndarray:
+    """ Unpack int64 keys into (N, 2) array of cells coordinates. """
+
+    coords = np.empty((len(keys), 2), np.int64)
+    coords[:, 0] = (keys & _LOW_MASK) - _X_BIAS
+    coords[:, 1] = keys >> 32
+    return coords
+
+
+def state_to_array(state: Collection[Pos]) -> np.ndarray:
+    """ Convert any game state (e.g. GameState, PackedState or array
+        of cells) to (N, 2) int64 array of cells coordinates.
+    """
+
+    if isinstance(state, PackedState):
+        return state.to_array()
+    if isinstance(state, np.ndarray):
+        return state.astype(np.int64, copy=False).reshape(-1, 2)
+
+    return np.fromiter(
+        chain.from_iterable(state), np.int64, count=2*len(state)
+    ).reshape(-1, 2)
+
+
+def cells_to_array(lived_cells: Optional[Iterable[Pos]]) -> np.ndarray:
+    """ Convert cells given to engine (any iterable of positions, array
+        of cells or None) to (N, 2) int64 array. Arrays aren't iterated,
+        so that e.g. memory-mapped cells are converted at once.
+    """
+
+    if lived_cells is None:
+        return np.empty((0, 2), np.int64)
+    if isinstance(lived_cells, (np.ndarray, PackedState)):
+        return state_to_array(lived_cells)
+    return np.array(list(lived_cells), np.int64).reshape(-1, 2)
+
+
+def state_to_keys(state: Collection[Pos]) -> np.ndarray:
+    """ Convert any game state to sorted array of unique int64 keys. """
+
+    if isinstance(state, PackedState):
+        return state.keys
+    return unique_keys(pack(state_to_array(state)))
+
+
+class PackedState(Set):
+    """ Immutable set of alive cells stored as sorted array of int64 keys,
+        i.e. 8 bytes per cell. Supports membership, iteration and set
+        operations like GameState, so it can be used instead of it.
+    """
+
+    __slots__ = ("keys",)
+
+    def __init__(self, lived_cells: Iterable[Pos] = ()):
+        """ Give only cells that alive and other is dead. """
+
+        if isinstance(lived_cells, PackedState):
+            self.keys = lived_cells.keys
+        elif isinstance(lived_cells, np.ndarray):
+            self.keys = unique_keys(pack(lived_cells.reshape(-1, 2)))
+        else:
+            self.keys = unique_keys(
+                pack(np.fromiter(
+                    (c for pos in lived_cells for c in pos), np.int64
+                ))
+            )
+
+    @classmethod
+    def from_array(cls, coords: np.ndarray) -> "PackedState":
+        """ Create state from (N, 2) array of cells coordinates. """
+        return cls.from_keys(unique_keys(pack(coords)))
+
+    @classmethod
+    def from_keys(cls, keys: np.ndarray) -> "PackedState":
+        """ Create state from sorted array of unique keys. """
+
+        state = cls.__new__(cls)
+        state.keys = keys
+        return state
+
+    @classmethod
+    def _from_iterable(cls, it: Iterable[Pos]) -> "PackedState":
+        return cls(it)
+
+    def to_array(self) -> np.ndarray:
+        """ Return (N, 2) array of cells coordinates. """
+        return unpack(self.keys)
+
+    def __contains__(self, pos) -> bool:
+        try:
+            x, y = int(pos[0]), int(pos[1])
+        except (TypeError, IndexError, ValueError):
+            return False
+
+        if not (
+            _INT32.min <= x <= _INT32.max and _INT32.min <= y <= _INT32.max
+        ):
+            return False
+
+        key = (y << 32) + x + _X_BIAS
+        idx = np.searchsorted(self.keys, key)
+        return bool(idx < len(self.keys) and self.keys[idx] == key)
+
+    def __iter__(self) -> Iterator[Pos]:
+        coords = self.to_array()
+        return zip(coords[:, 0].tolist(), coords[:, 1].tolist())
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self)} cells)"
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PackedState):
+            return np.array_equal(self.keys, other.keys)
+        return super().__eq__(other)
+
+    __hash__ = None
+
+    def __and__(self, other):
+        if isinstance(other, PackedState):
+            return self.from_keys(np.intersect1d(
+                self.keys, other.keys, assume_unique=True
+            ))
+        return super().__and__(other)
+
+    def __or__(self, other):
+        if isinstance(other, PackedState):
+            return self.from_keys(np.union1d(self.keys, other.keys))
+        return super().__or__(other)
+
+    def __sub__(self, other):
+        if isinstance(other, PackedState):
+            return self.from_keys(np.setdiff1d(
+                self.keys, other.keys, assume_unique=True
+            ))
+        return super().__sub__(other)
+
+    def __xor__(self, other):
+        if isinstance(other, PackedState):
+            return self.from_keys(np.setxor1d(
+                self.keys, other.keys, assume_unique=True
+            ))
+        return super().__xor__(other)
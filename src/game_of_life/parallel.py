@@ -0,0 +1,268 @@
+""" Parallel game of life engine. Grid is kept in shared memory and
+    split into horizontal strips, each stepped by worker process.
+"""
+
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Optional, Iterable
+
+import numpy as np
+
+from module_typing import GameState, Pos
+from .dense import neighbors_count
+from .rules import Rule, CONWAY
+from .packed_state import cells_to_array, pack
+
+# Shared memory blocks attached by worker process (name -> block).
+_attached: dict[str, shared_memory.SharedMemory] = {}
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """ Attach to shared memory block in worker process. Only blocks
+        of current grids are kept attached.
+    """
+
+    block = _attached.get(name)
+    if block is None:
+        if len(_attached) >= 2:
+            for old in _attached.values():
+                old.close()
+            _attached.clear()
+
+        block = shared_memory.SharedMemory(name)
+        _attached[name] = block
+
+    return block
+
+
+def _step_strip(args: tuple) -> Optional[tuple[int, int, int, int]]:
+    """ Compute rows [y0, y1) of destination grid from source grid
+        with given rule. Rows y0 - 1 and y1 are read as halo. Returns live
+        box of strip as (min_col, min_row, max_col, max_row) or None
+        if it's empty.
+    """
+
+    src_name, dst_name, shape, y0, y1, rule = args
+    src = np.ndarray(shape, np.uint8, buffer=_attach(src_name).buf)
+    dst = np.ndarray(shape, np.uint8, buffer=_attach(dst_name).buf)
+
+    block = src[y0 - 1:y1 + 1]
+    counts = neighbors_count(block)
+    inner = block[1:-1, 1:-1]
+
+    strip = dst[y0:y1, 1:-1]
+    strip[...] = rule.lookup(inner, counts)
+
+    rows = np.flatnonzero(strip.any(axis=1))
+    if not len(rows):
+        return None
+
+    cols = np.flatnonzero(strip.any(axis=0))
+    return (
+        int(cols[0]) + 1, int(rows[0]) + y0,
+        int(cols[-1]) + 1, int(rows[-1]) + y0,
+    )
+
+
+class ParallelCells:
+    """ Game of life engine that steps dense grid in horizontal strips
+        using pool of worker processes. Grids are double-buffered in
+        shared memory, so workers read halo rows of neighbor strips
+        directly and no state is pickled. Has the same interface as Cells.
+    """
+
+    def __init__(
+        self, lived_cells: Optional[Iterable[Pos]] = None,
+        rule: Rule = CONWAY, processes: Optional[int] = None,
+        margin: int = 8,
+    ):
+        """ Give only cells that alive and other is dead.
+            processes: count of worker processes, all CPUs by default.
+        """
+
+        self.rule = rule
+        self.generation = 0
+        self.processes = processes or mp.cpu_count()
+        self.margin = max(margin, 1)
+
+        # Spawned workers don't inherit threads and OpenGL context of
+        # main process.
+        self._pool = mp.get_context("spawn").Pool(self.processes)
+        self._blocks: list[shared_memory.SharedMemory] = []
+
+        coords = cells_to_array(lived_cells)
+
+        if len(coords):
+            min_x, min_y = coords.min(axis=0)
+            max_x, max_y = coords.max(axis=0)
+        else:
+            min_x = min_y = max_x = max_y = 0
+
+        m = self.margin
+        self.__allocate((max_y - min_y + 1 + 2*m, max_x - min_x + 1 + 2*m))
+
+        # Origin is coordinates of grid[0, 0] cell.
+        self._origin = (int(min_x) - m, int(min_y) - m)
+        self._grid[
+            coords[:, 1] - self._origin[1], coords[:, 0] - self._origin[0]
+        ] = 1
+
+        if len(coords):
+            self._live_box = (
+                m, m, m + int(max_x - min_x), m + int(max_y - min_y)
+            )
+        else:
+            self._live_box = None
+        self.__update_bounding_box()
+
+        # Back grid holds state before last generation once it's stepped.
+        # Keys of cells changed by last generation are computed on demand.
+        self._stepped = False
+        self._changes: Optional[np.ndarray] = None
+
+    @property
+    def current_state(self) -> GameState:
+        """ Set of alive cells. """
+
+        cells = self.live_cells()
+        return set(zip(cells[:, 0].tolist(), cells[:, 1].tolist()))
+
+    def live_cells(self) -> np.ndarray:
+        """ Return (N, 2) array of alive cells. """
+
+        ys, xs = np.nonzero(self._grid)
+        return np.stack((xs + self._origin[0], ys + self._origin[1]), axis=1)
+
+    @property
+    def population(self) -> int:
+        """ Count of alive cells. """
+        return int(np.count_nonzero(self._grid))
+
+    @property
+    def changes(self) -> Optional[np.ndarray]:
+        """ Packed keys of cells born or died at last generation,
+            None before first generation.
+        """
+
+        if self._changes is None and self._stepped:
+            # Flat nonzero is much faster than 2D one.
+            changed = np.flatnonzero(self._grid != self._back)
+            ys, xs = np.divmod(changed, self._grid.shape[1])
+            self._changes = pack(np.stack(
+                (xs + self._origin[0], ys + self._origin[1]), axis=1
+            ))
+        return self._changes
+
+    def step(self, n: int = 1) -> None:
+        """ Do next n iterations of game. """
+
+        for _ in range(n):
+            self.__step()
+        self.generation += n
+
+    def __step(self) -> None:
+
+        self.__fit_margin()
+
+        h, _ = self._grid.shape
+        bounds = np.linspace(1, h - 1, self.processes + 1).astype(int)
+        tasks = [
+            (
+                self._blocks[self._current].name,
+                self._blocks[1 - self._current].name,
+                self._grid.shape, int(y0), int(y1), self.rule,
+            )
+            for y0, y1 in zip(bounds[:-1], bounds[1:]) if y1 > y0
+        ]
+
+        boxes = [
+            box for box in self._pool.map(_step_strip, tasks)
+            if box is not None
+        ]
+
+        self._current = 1 - self._current
+        self._grid, self._back = self._back, self._grid
+        self._stepped = True
+        self._changes = None
+
+        if boxes:
+            boxes = np.array(boxes)
+            self._live_box = (
+                int(boxes[:, 0].min()), int(boxes[:, 1].min()),
+                int(boxes[:, 2].max()), int(boxes[:, 3].max()),
+            )
+        else:
+            self._live_box = None
+        self.__update_bounding_box()
+
+    def close(self) -> None:
+        """ Stop worker processes and free shared memory. """
+
+        self._pool.terminate()
+        self.__free()
+
+    def __update_bounding_box(self) -> None:
+        if self._live_box is None:
+            self.bounding_box = (0, 0, 0, 0)
+        else:
+            x0, y0, x1, y1 = self._live_box
+            self.bounding_box = (
+                x0 + self._origin[0], y0 + self._origin[1],
+                x1 + self._origin[0], y1 + self._origin[1],
+            )
+
+    def __allocate(self, shape: tuple[int, int]) -> None:
+        """ Allocate pair of zeroed grids with given shape
+            in shared memory.
+        """
+
+        size = max(int(np.prod(shape)), 1)
+        self._blocks = [shared_memory.SharedMemory(create=True, size=size)
+                        for _ in range(2)]
+        self._current = 0
+
+        self._grid, self._back = (
+            np.ndarray(shape, np.uint8, buffer=block.buf)
+            for block in self._blocks
+        )
+        self._grid.fill(0)
+        self._back.fill(0)
+
+    def __free(self) -> None:
+        self._grid = self._back = None
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __fit_margin(self) -> None:
+        """ Grow grids if alive cells come to border of grid,
+            shrink them if there's too much empty space.
+        """
+
+        if self._live_box is None:
+            return
+
+        h, w = self._grid.shape
+        x0, y0, x1, y1 = self._live_box
+        margins = (x0, y0, w - 1 - x1, h - 1 - y1)
+
+        # Border rows and columns of grid must stay dead, because they
+        # aren't computed by workers.
+        if (
+            min(margins) >= 2
+            and max(margins) <= 4*self.margin + max(w, h) // 2
+        ):
+            return
+
+        # Margin grows with pattern, so expanding patterns
+        # are reallocated rarely.
+        m = max(self.margin, (max(x1 - x0, y1 - y0) + 1) // 8)
+        live = self._grid[y0:y1 + 1, x0:x1 + 1].copy()
+
+        self.__free()
+        self.__allocate((y1 - y0 + 1 + 2*m, x1 - x0 + 1 + 2*m))
+        self._grid[m:-m, m:-m] = live
+
+        self._origin = (self._origin[0] + x0 - m, self._origin[1] + y0 - m)
+        self._live_box = (m, m, m + x1 - x0, m + y1 - y0)
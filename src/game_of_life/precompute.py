@@ -0,0 +1,188 @@
+""" Background precompute pipeline. Worker process steps its own copy
+    of engine ahead of playback and passes generations as coordinate
+    arrays in shared memory through bounded ring of slots.
+"""
+
+import multiprocessing as mp
+import queue
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from .snapshot import Snapshot
+from .cycles import REHASH_INTERVAL, Cycle, CycleDetector
+from .parallel import ParallelCells
+
+_CELL_SIZE = 2 * np.dtype(np.int32).itemsize
+_POLL_PERIOD = 0.1
+
+
+def _produce(
+    engine_type: type, cells: np.ndarray, rule, generation: int,
+    stride: int, policy, slots: int, free: mp.Queue, ready: mp.Queue, stop,
+) -> None:
+    """ Worker process. Steps engine by stride generations and writes
+        every resulting generation to free slot. Blocks while no slot
+        is free, which limits how far producer runs ahead. Once pattern
+        becomes still life, it's written last time and worker stops.
+    """
+
+    engine = engine_type(cells, rule)
+    blocks: list[Optional[shared_memory.SharedMemory]] = [None] * slots
+    cycles = CycleDetector(interval=REHASH_INTERVAL)
+    cycles.observe(engine, generation)
+
+    try:
+        while not stop.is_set():
+            if cycles.cycle is not None and cycles.cycle.is_still:
+                stop.wait(_POLL_PERIOD)
+                continue
+
+            for _ in range(stride):
+                if policy is None:
+                    engine.step()
+                else:
+                    engine = policy.step(engine, generation)
+                generation += 1
+                cycles.observe(engine, generation)
+            cells = engine.live_cells().astype(np.int32)
+
+            slot = None
+            while slot is None and not stop.is_set():
+                try:
+                    slot = free.get(timeout=_POLL_PERIOD)
+                except queue.Empty:
+                    pass
+            if slot is None:
+                break
+
+            # Slot block is replaced by twice bigger one, when it's too small.
+            block = blocks[slot]
+            if block is None or block.size < cells.nbytes:
+                if block is not None:
+                    block.close()
+                    block.unlink()
+                block = shared_memory.SharedMemory(
+                    create=True, size=max(2*cells.nbytes, _CELL_SIZE)
+                )
+                blocks[slot] = block
+
+            np.ndarray(cells.shape, np.int32, buffer=block.buf)[...] = cells
+            ready.put((
+                generation, slot, block.name, len(cells), engine.bounding_box,
+                cycles.cycle,
+            ))
+    finally:
+        # Worker exits without running finalizers, so engine (e.g. its
+        # pool or file) is released here.
+        close = getattr(engine, "close", None)
+        if close is not None:
+            close()
+        # Frames left in queue aren't needed anymore.
+        ready.cancel_join_thread()
+        for block in blocks:
+            if block is not None:
+                block.close()
+                block.unlink()
+
+
+class Precompute:
+    """ Pipeline that computes generations of cells in worker process
+        ahead of playback. At most slots generations are kept computed,
+        then worker waits until they are taken.
+    """
+
+    def __init__(
+        self, cells, slots: int = 64, stride: int = 1, generation: int = 0,
+        policy=None,
+    ):
+        """ cells: engine with initial state, its type and rule are used
+            by worker. ParallelCells can't be used, since worker is
+            daemon process, which can't start pool of its own.
+            generation: generation of initial state.
+            policy: EnginePolicy to switch engines by in worker.
+            slots: count of generations computed ahead.
+            stride: count of generations between computed ones.
+        """
+
+        engine_type = type(cells)
+        if engine_type is ParallelCells:
+            raise ValueError("ParallelCells can't be precomputed.")
+
+        ctx = mp.get_context("spawn")
+        self.slots = slots
+        self.stride = stride
+        self._free = ctx.Queue()
+        self._ready = ctx.Queue()
+        self._stop = ctx.Event()
+
+        for slot in range(slots):
+            self._free.put(slot)
+
+        self._process = ctx.Process(
+            target=_produce, daemon=True, args=(
+                engine_type, cells.live_cells(), cells.rule, generation,
+                stride, policy, slots, self._free, self._ready, self._stop,
+            ),
+        )
+        self._process.start()
+
+        # Blocks attached by consumer (slot -> block).
+        self._attached: dict[int, shared_memory.SharedMemory] = {}
+
+        # Cycle detected by worker and last snapshot, which is repeated
+        # after worker stopped on still life.
+        self.cycle: Optional[Cycle] = None
+        self._last: Optional[Snapshot] = None
+
+    def take(self, count: int) -> Optional[Snapshot]:
+        """ Take up to count computed generations (without waiting) and
+            return snapshot of the last one, or None if none is computed.
+        """
+
+        last = None
+        for _ in range(count):
+            try:
+                frame = self._ready.get_nowait()
+            except queue.Empty:
+                break
+
+            if last is not None:
+                self._free.put(last[1])
+            last = frame
+
+        if last is None:
+            if self.cycle is None or not self.cycle.is_still:
+                return None
+            # Still life is computed no further, but generations go on.
+            self._last = self._last._replace(
+                generation=self._last.generation + count * self.stride
+            )
+            return self._last
+
+        generation, slot, name, length, bounding_box, self.cycle = last
+        block = self._attached.get(slot)
+        if block is None or block.name != name:
+            if block is not None:
+                block.close()
+            block = shared_memory.SharedMemory(name)
+            self._attached[slot] = block
+
+        # Slot is reused by worker, so cells are copied out of it.
+        cells = np.ndarray((length, 2), np.int32, buffer=block.buf).copy()
+        cells.flags.writeable = False
+        self._free.put(slot)
+
+        self._last = Snapshot(generation, cells, bounding_box)
+        return self._last
+
+    def close(self) -> None:
+        """ Stop worker and release shared memory. """
+
+        self._stop.set()
+        self._process.join()
+
+        for block in self._attached.values():
+            block.close()
+        self._attached.clear()
@@ -2,22 +2,42 @@
 
 import threading
 import ctypes
+from typing import Optional
 
 import numpy as np
 from OpenGL.GL import *
 from OpenGL.GL import shaders
 
 import globals
-from . import Cells
-from utils import MutexVar
+from .engine import Engine
+from .instance_buffer import InstanceBuffer, OFFSET_SIZE
+from .density import visible_rect, pixels_per_cell, density_grid
+from .spatial_index import SpatialIndex
+from .snapshot import Snapshot, SnapshotBuffer
 
 
 class Renderer:
     """ Class to render game of life cells. """
 
-    def __init__(self, cells: Cells, shader):
+    def __init__(
+        self, cells: Engine, shader, density_shader=None,
+        culling: bool = False,
+    ):
+        """ density_shader: shader to draw density of cells when view
+            is zoomed out. Without it cells are always drawn one by one.
+            culling: if True, only visible cells are kept in instance
+            buffer and drawn, they are looked up by spatial index.
+        """
+
         self.cells = cells
         self.shader = shader
+        self.density_shader = density_shader
+        self.culling = culling
+        self.spatial_index = SpatialIndex() if culling else None
+
+        # Density is drawn instead of cells, when cell is smaller
+        # than that count of pixels.
+        self.lod_threshold = 1.0
 
         self.view_matrix = np.matrix((
             (1, 0, 0, 0),
@@ -26,31 +46,54 @@ class Renderer:
             (0, 0, 0, 1),
         ), np.float32)
 
-        self.should_update_instance_vbo = MutexVar(True)
+        # Cells are rendered from snapshots published by game, so that
+        # rendering never waits for stepping.
+        self.snapshots = SnapshotBuffer(Snapshot.of(cells, 0))
+        self.snapshot = None
+
         self.instance_vbo = glGenBuffers(1)
         self.vao = glGenVertexArrays(1)
 
+        # Offsets are mirrored at CPU, so that only changed ones
+        # are uploaded. GPU storage is reallocated only on growth.
+        # Ranges changed since last upload are kept, since nothing is
+        # uploaded while density is drawn. None means whole buffer.
+        self.instance_buffer = InstanceBuffer()
+        self.instance_vbo_capacity = 0
+        self.instance_buffer_version = 0
+        self.pending_ranges: Optional[list[tuple[int, int]]] = []
+        self.cells_count = 0
+
+        # Key of view visible cells were queried for in culling mode.
+        self.visible_key = None
+
         self.__create_cell_buffers()
         self.__create_instance_vbo()
 
+        if density_shader is not None:
+            self.__create_density_buffers()
+
     def render(self) -> None:
         """ Render game of life cells to current context. """
 
-        if self.should_update_instance_vbo.inner:
-            self.should_update_instance_vbo.inner = False
-            self.__create_instance_vbo()
+        snapshot = self.snapshots.latest
+        if snapshot is not self.snapshot:
+            self.snapshot = snapshot
+            self.__update_instance_vbo()
 
-        glBindVertexArray(self.vao)
+        if self.culling:
+            self.__update_visible_cells()
 
-        location = glGetUniformLocation(self.shader, "proj_matrix")
-        glProgramUniformMatrix4fv(
-            self.shader, location, 1, GL_TRUE, globals.proj_matrix
-        )
+        if self.__is_zoomed_out():
+            self.__render_density()
+        else:
+            self.__upload_instances()
+            self.__render_cells()
 
-        location = glGetUniformLocation(self.shader, "view_matrix")
-        glProgramUniformMatrix4fv(
-            self.shader, location, 1, GL_TRUE, self.view_matrix
-        )
+    def __render_cells(self) -> None:
+        glBindVertexArray(self.vao)
+
+        self.__set_matrices(self.shader)
 
         glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
 
@@ -62,6 +105,54 @@ class Renderer:
         glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
         glBindVertexArray(0)
 
+    def __render_density(self) -> None:
+        """ Render density of cells per pixel as single textured quad. """
+
+        key = (self.instance_buffer_version, self.view_matrix.tobytes(),
+               globals.viewport_size)
+        if key != self.density_key:
+            self.density_key = key
+            self.__update_density_texture()
+
+        glBindVertexArray(self.density_vao)
+
+        self.__set_matrices(self.density_shader)
+        location = glGetUniformLocation(self.density_shader, "rect")
+        x0, y0, x1, y1 = self.density_rect
+        glProgramUniform4f(
+            self.density_shader, location, x0, y0, x1 - x0, y1 - y0
+        )
+
+        glActiveTexture(GL_TEXTURE0)
+        glBindTexture(GL_TEXTURE_2D, self.density_texture)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+
+        shaders.glUseProgram(self.density_shader)
+        glDrawElements(GL_TRIANGLES, 6, GL_UNSIGNED_INT, None)
+
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glBindVertexArray(0)
+
+    def __is_zoomed_out(self) -> bool:
+        if self.density_shader is None or globals.viewport_size is None:
+            return False
+
+        return pixels_per_cell(
+            self.view_matrix, globals.proj_matrix, globals.viewport_size[0]
+        ) < self.lod_threshold
+
+    def __set_matrices(self, shader) -> None:
+        location = glGetUniformLocation(shader, "proj_matrix")
+        glProgramUniformMatrix4fv(
+            shader, location, 1, GL_TRUE, globals.proj_matrix
+        )
+
+        location = glGetUniformLocation(shader, "view_matrix")
+        glProgramUniformMatrix4fv(
+            shader, location, 1, GL_TRUE, self.view_matrix
+        )
+
     @property
     def view_matrix(self):
         """ It's kind of view matrix for 3D games, but for 2D. """
@@ -109,11 +200,7 @@ class Renderer:
     def __create_instance_vbo(self) -> None:
         glBindVertexArray(self.vao)
 
-        offsets = self.__get_offsets()
-        self.cells_count = len(offsets)
-
         glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
-        glBufferData(GL_ARRAY_BUFFER, offsets.nbytes, offsets, GL_DYNAMIC_DRAW)
 
         glEnableVertexAttribArray(1)
         glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, 2*sizeof(GLfloat), None)
@@ -122,9 +209,121 @@ class Renderer:
         glBindBuffer(GL_ARRAY_BUFFER, 0)
         glBindVertexArray(0)
 
-    def __get_offsets(self) -> np.ndarray:
-        offsets = np.empty((len(self.cells.current_state), 2), np.float32)
-        for idx, pos in enumerate(self.cells.current_state):
-            offsets[idx] = pos
+    def __create_density_buffers(self) -> None:
+        # Quad uses the same vertices as cells, but without offsets.
+        self.density_vao = glGenVertexArrays(1)
+        glBindVertexArray(self.density_vao)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 2*sizeof(GLfloat), None)
+
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindVertexArray(0)
+
+        self.density_texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.density_texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+        self.density_key = None
+        self.density_rect = (0, 0, 0, 0)
+
+    def __update_density_texture(self) -> None:
+        """ Aggregate cells into buckets of pixel size
+            and upload them as texture.
+        """
+
+        bucket_size = 1 / pixels_per_cell(
+            self.view_matrix, globals.proj_matrix, globals.viewport_size[0]
+        )
+
+        buffer = self.instance_buffer
+        density, self.density_rect = density_grid(
+            buffer.offsets[:buffer.count],
+            visible_rect(self.i_view_matrix, globals.i_proj_matrix),
+            bucket_size, self.snapshot.bounding_box,
+        )
 
-        return offsets.flatten()
+        glBindTexture(GL_TEXTURE_2D, self.density_texture)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glTexImage2D(
+            GL_TEXTURE_2D, 0, GL_R32F, density.shape[1], density.shape[0], 0,
+            GL_RED, GL_FLOAT, density,
+        )
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    def __update_visible_cells(self) -> None:
+        """ Query cells visible in current view (with outline of one cell)
+            and update instance buffer by them, so that only cells that
+            appeared or disappeared are uploaded.
+        """
+
+        key = (self.instance_buffer_version, self.view_matrix.tobytes(),
+               globals.viewport_size)
+        if key == self.visible_key:
+            return
+        self.visible_key = key
+
+        x0, y0, x1, y1 = visible_rect(
+            self.i_view_matrix, globals.i_proj_matrix
+        )
+        self.__update_instance_buffer(
+            self.spatial_index.query(x0 - 1, y0 - 1, x1, y1)
+        )
+
+    def __update_instance_vbo(self) -> None:
+        """ Update instance buffer by cells of new snapshot. """
+
+        self.instance_buffer_version += 1
+        if self.culling:
+            # Visible cells are queried at render.
+            self.spatial_index.update(self.snapshot.cells)
+            return
+
+        self.__update_instance_buffer(self.snapshot.cells)
+
+    def __update_instance_buffer(self, cells) -> None:
+        """ Update offsets at CPU and remember changed ranges. """
+
+        buffer = self.instance_buffer
+        ranges = buffer.update(cells)
+        if self.pending_ranges is None:
+            return
+
+        self.pending_ranges.extend(ranges)
+        # Too many small ranges are slower than one upload.
+        if sum(end - start for start, end in self.pending_ranges) \
+                >= buffer.count:
+            self.pending_ranges = None
+
+    def __upload_instances(self) -> None:
+        """ Upload offsets changed since last upload. """
+
+        buffer = self.instance_buffer
+        if self.pending_ranges == [] \
+                and buffer.capacity == self.instance_vbo_capacity:
+            return
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.instance_vbo)
+
+        if self.pending_ranges is None \
+                or buffer.capacity != self.instance_vbo_capacity:
+            self.instance_vbo_capacity = buffer.capacity
+            glBufferData(
+                GL_ARRAY_BUFFER, buffer.offsets.nbytes, buffer.offsets,
+                GL_DYNAMIC_DRAW
+            )
+        else:
+            for start, end in self.pending_ranges:
+                glBufferSubData(
+                    GL_ARRAY_BUFFER, start * OFFSET_SIZE,
+                    (end - start) * OFFSET_SIZE, buffer.offsets[start:end]
+                )
+
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.pending_ranges = []
+        self.cells_count = buffer.count
@@ -1,9 +1,239 @@
 """ Parser for RLE (Run Length Encoded) file. """
 
+import io
 import re
 import pathlib
+import warnings
+from typing import BinaryIO, NamedTuple, Optional, Collection
 
-from module_typing import GameState
+import numpy as np
+
+from module_typing import GameState, Pos
+from .rules import Rule, CONWAY
+from .packed_state import state_to_array
+
+CHUNK_SIZE = 1 << 20
+LINE_LENGTH = 70
+
+_HEADER_RE = re.compile(
+    r"\s*x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*([^\s,]+))?"
+)
+
+_DATA_RE = re.compile(rb"[\d.bo$!A-Z\s]*")
+
+_IS_WHITESPACE = np.zeros(256, bool)
+_IS_WHITESPACE[list(b" \t\r\n")] = True
+_DIGIT_0, _DIGIT_9 = ord("0"), ord("9")
+_DEAD, _DEAD_DOT = ord("b"), ord(".")
+_NEW_LINE, _END = ord("$"), ord("!")
+
+
+class RleHeader(NamedTuple):
+    """ Header line of RLE file. Sizes are None if header is missing. """
+
+    width: Optional[int]
+    height: Optional[int]
+    rule: Rule
+
+
+def _open(src_or_path: str) -> BinaryIO:
+    path = pathlib.Path(src_or_path).expanduser()
+    if path.is_file():
+        return open(path, "rb")
+    return io.BytesIO(src_or_path.encode())
+
+
+def _parse_rule(rulestring: str) -> Rule:
+    """ Parse rule of header. Rules that aren't B/S ones (e.g. named
+        ones like Life) fall back to Conway's one with warning.
+    """
+
+    try:
+        return Rule.parse(rulestring)
+    except ValueError:
+        warnings.warn(
+            f"Unsupported rule {rulestring!r}, B3/S23 is used instead."
+        )
+        return CONWAY
+
+
+def _read_header(
+    stream: BinaryIO, encoding: str, parse_rule: bool = True,
+) -> tuple[RleHeader, bytes]:
+    """ Skip comments and read header line, so that stream is left
+        at the beginning of cells data. Returns header and beginning of
+        cells data that was read with header line, if any.
+        parse_rule: whether to parse rule, otherwise it's CONWAY.
+    """
+
+    for line in stream:
+        if line.startswith(b"#") or not line.strip():
+            continue
+
+        match = _HEADER_RE.match(line.decode(encoding))
+        if match:
+            width, height, rule = match.groups()
+            header = RleHeader(
+                int(width), int(height),
+                _parse_rule(rule) if rule and parse_rule else CONWAY,
+            )
+            return header, b""
+
+        # Line without header is skipped like header, unless it's data.
+        if _DATA_RE.fullmatch(line):
+            return RleHeader(None, None, CONWAY), line
+        break
+
+    return RleHeader(None, None, CONWAY), b""
+
+
+class _RunsDecoder:
+    """ Decoder of RLE data fed by chunks. Every chunk is tokenized
+        with vectorized operations and runs of alive cells are
+        collected as arrays of (x, y, length).
+    """
+
+    def __init__(self):
+        self.x = 0
+        self.y = 0
+        self.finished = False
+        self.runs: list[np.ndarray] = []
+        self._tail = b""
+
+    def feed(self, chunk: bytes, last: bool = False) -> None:
+        """ Decode next chunk of data. """
+
+        data = np.frombuffer(self._tail + chunk, np.uint8)
+        data = data[~_IS_WHITESPACE[data]]
+
+        is_digit = (data >= _DIGIT_0) & (data <= _DIGIT_9)
+        tokens = np.flatnonzero(~is_digit)
+
+        end = np.flatnonzero(data[tokens] == _END)
+        if len(end):
+            tokens = tokens[:end[0]]
+            self.finished = True
+            self._tail = b""
+        elif not last:
+            # Run count may continue in next chunk.
+            cut = tokens[-1] + 1 if len(tokens) else 0
+            self._tail = data[cut:].tobytes()
+            data = data[:cut]
+            is_digit = is_digit[:cut]
+        if not len(tokens):
+            return
+
+        counts = self.__run_counts(data, is_digit, tokens)
+        chars = data[tokens]
+        self.__decode(chars, counts)
+
+    def cells(self) -> np.ndarray:
+        """ Return decoded alive cells as (N, 2) int32 array. """
+
+        if not self.runs:
+            return np.empty((0, 2), np.int32)
+
+        runs = np.concatenate(self.runs)
+        lengths = runs[:, 2]
+        starts = np.cumsum(lengths) - lengths
+
+        cells = np.empty((int(lengths.sum()), 2), np.int32)
+        cells[:, 0] = (
+            np.repeat(runs[:, 0] - starts, lengths)
+            + np.arange(len(cells))
+        )
+        cells[:, 1] = np.repeat(runs[:, 1], lengths)
+        return cells
+
+    @staticmethod
+    def __run_counts(
+        data: np.ndarray, is_digit: np.ndarray, tokens: np.ndarray
+    ) -> np.ndarray:
+        """ Compute run count of every token from digits before it.
+            Token without digits has count 1.
+        """
+
+        is_digit = is_digit[:tokens[-1]]
+        digits = np.flatnonzero(is_digit)
+
+        # Digit belongs to next token, i.e. its index is count of tokens
+        # before digit.
+        owner = np.cumsum(~is_digit)[digits]
+        power = tokens[owner] - digits - 1
+
+        values = (data[digits] - _DIGIT_0).astype(np.int64) * 10**power
+        counts = np.bincount(
+            owner, weights=values, minlength=len(tokens)
+        ).astype(np.int64)
+
+        has_digits = np.zeros(len(tokens), bool)
+        has_digits[owner] = True
+        counts[~has_digits] = 1
+        return counts
+
+    def __decode(self, chars: np.ndarray, counts: np.ndarray) -> None:
+        is_new_line = chars == _NEW_LINE
+
+        # Advance of x by every token and x before it, which is reset
+        # by every new line.
+        advance = np.where(is_new_line, 0, counts)
+        before = np.cumsum(advance) - advance
+        line_start = np.maximum.accumulate(np.where(is_new_line, before, -1))
+        xs = np.where(line_start < 0, self.x + before, before - line_start)
+
+        # Rows go down, i.e. y decreases.
+        rows = np.where(is_new_line, counts, 0)
+        ys = self.y - (np.cumsum(rows) - rows)
+
+        alive = ~(is_new_line | (chars == _DEAD) | (chars == _DEAD_DOT))
+        self.runs.append(np.stack(
+            (xs[alive], ys[alive], counts[alive]), axis=1
+        ))
+
+        self.x = int(xs[-1] + advance[-1]) if not is_new_line[-1] else 0
+        self.y -= int(rows.sum())
+
+
+def parse_rle_header(src_or_path: str, encoding: str = "utf8") -> RleHeader:
+    """ Parse header of RLE file, i.e. line like
+        x = 3, y = 3, rule = B3/S23. If there's no rule or it isn't
+        B/S one, Conway's one is used.
+        src_or_path: path to source or source data.
+    """
+
+    with _open(src_or_path) as stream:
+        return _read_header(stream, encoding)[0]
+
+
+def parse_rle_rule(src_or_path: str, encoding: str = "utf8") -> Rule:
+    """ Parse rule from header of RLE file. If there's no rule or it
+        isn't B/S one, Conway's one is returned.
+        src_or_path: path to source or source data.
+    """
+    return parse_rle_header(src_or_path, encoding).rule
+
+
+def parse_rle_array(
+    src_or_path: str, encoding: str = "utf8", chunk_size: int = CHUNK_SIZE
+) -> np.ndarray:
+    """ Parse RLE file by chunks in single pass and return (N, 2) int32
+        array of lived cells.
+        src_or_path: path to source or source data.
+    """
+
+    decoder = _RunsDecoder()
+    with _open(src_or_path) as stream:
+        # Only cells are needed, so rule isn't validated.
+        _, data = _read_header(stream, encoding, parse_rule=False)
+        decoder.feed(data)
+
+        while not decoder.finished:
+            chunk = stream.read(chunk_size)
+            decoder.feed(chunk, last=not chunk)
+            if not chunk:
+                break
+
+    return decoder.cells()
 
 
 def parse_rle(src_or_path: str, encoding: str = "utf8") -> GameState:
@@ -11,30 +241,61 @@ def parse_rle(src_or_path: str, encoding: str = "utf8") -> GameState:
         src_or_path: path to source or source data.
     """
 
-    if pathlib.Path(src_or_path).expanduser().is_file():
-        with open(src_or_path, encoding=encoding) as src:
-            data = src.read()
+    cells = parse_rle_array(src_or_path, encoding)
+    return set(zip(cells[:, 0].tolist(), cells[:, 1].tolist()))
+
+
+def _run(count: int, tag: str) -> str:
+    return f"{count}{tag}" if count > 1 else tag
+
+
+def write_rle(
+    path: str, cells: Collection[Pos], rule: Rule = CONWAY,
+    encoding: str = "utf8",
+) -> None:
+    """ Write cells to RLE file. Pattern is written from its top left
+        corner, so that it's parsed back translated to (0, 0) corner.
+        Lines of cells data are at most LINE_LENGTH characters long.
+    """
+
+    cells = state_to_array(cells)
+    if len(cells):
+        min_x, max_y = cells[:, 0].min(), cells[:, 1].max()
+        width = int(cells[:, 0].max() - min_x + 1)
+        height = int(max_y - cells[:, 1].min() + 1)
+        cells = cells[np.lexsort((cells[:, 0], -cells[:, 1]))]
+        rows, cols = max_y - cells[:, 1], cells[:, 0] - min_x
     else:
-        data = src_or_path
-
-    # Remove comments, whitespaces, newlines, and first line that
-    # contains info about sizes of structure.
-    data = re.sub("^#.*\n", "", data, flags=re.MULTILINE)
-    data = re.sub("^.*\n", "", data)
-    data = re.sub("[ \n]", "", data, flags=re.MULTILINE)
-
-    lived_cells = set()
-    curr_y = 0
-    for line in data.split("$"):
-        curr_x = 0
-        for item in re.findall(r"\d*[bo]", line):
-            run_count = int(item[:-1]) if len(item) > 1 else 1
-            if item[-1] == "o":
-                lived_cells.update(
-                    (curr_x + i, curr_y) for i in range(run_count)
-                )
-
-            curr_x += run_count
-        curr_y -= 1
-
-    return lived_cells
+        width = height = 0
+        rows = cols = np.empty(0, np.int64)
+
+    # Runs of alive cells start where cell doesn't continue previous one.
+    starts = np.flatnonzero(
+        (np.diff(rows, prepend=-1) != 0) | (np.diff(cols, prepend=-2) != 1)
+    )
+    ends = np.append(starts[1:], len(cols))
+
+    tokens = []
+    row, col = 0, 0
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        run_row, run_col = int(rows[start]), int(cols[start])
+        if run_row != row:
+            tokens.append(_run(run_row - row, "$"))
+            row, col = run_row, 0
+        if run_col != col:
+            tokens.append(_run(run_col - col, "b"))
+        tokens.append(_run(end - start, "o"))
+        col = run_col + end - start
+    tokens.append("!")
+
+    lines = [f"x = {width}, y = {height}, rule = {rule}"]
+    line = ""
+    for token in tokens:
+        if len(line) + len(token) > LINE_LENGTH:
+            lines.append(line)
+            line = ""
+        line += token
+    lines.append(line)
+
+    with open(path, "w", encoding=encoding) as file:
+        file.write("\n".join(lines) + "\n")
@@ -0,0 +1,87 @@
+""" Outer-totalistic (B/S) rules of life-like cellular automata. """
+
+import re
+from typing import Iterable
+
+import numpy as np
+
+_RULE_FORMATS = (
+    (re.compile(r"B([0-8]*)/?S([0-8]*)"), False),
+    (re.compile(r"S([0-8]*)/?B([0-8]*)"), True),
+    # Old notation: survivals/births.
+    (re.compile(r"([0-8]*)/([0-8]*)"), True),
+)
+
+
+class Rule:
+    """ Life-like rule, i.e. counts of alive neighbors for which dead cell
+        is born and alive cell survives. Rule is compiled into transition
+        table, where table[alive, neighbors] is next state of cell.
+    """
+
+    def __init__(self, births: Iterable[int], survivals: Iterable[int]):
+        self.births = frozenset(births)
+        self.survivals = frozenset(survivals)
+
+        if not self.births | self.survivals <= set(range(9)):
+            raise ValueError("Neighbors counts must be in range 0..8.")
+        if 0 in self.births:
+            raise ValueError(
+                "Rules with B0 aren't supported, because they make "
+                "infinite plane alive."
+            )
+
+        self.table = np.zeros((2, 9), bool)
+        self.table[0, list(self.births)] = True
+        self.table[1, list(self.survivals)] = True
+
+        # Same table for indexing by 9*alive + neighbors.
+        self.flat_table = self.table.ravel()
+
+    @classmethod
+    def parse(cls, rulestring: str) -> "Rule":
+        """ Parse rulestring like B3/S23, S23/B3 or 23/3. Topology
+            suffix (e.g. B3/S23:P10,10) is ignored, i.e. plane is
+            always infinite.
+        """
+
+        rulestring = re.sub(r"\s", "", rulestring).upper()
+        rulestring = rulestring.partition(":")[0]
+        for pattern, survivals_first in _RULE_FORMATS:
+            match = pattern.fullmatch(rulestring)
+            if match:
+                births, survivals = match.groups()
+                if survivals_first:
+                    births, survivals = survivals, births
+                return cls(map(int, births), map(int, survivals))
+
+        raise ValueError(f"Invalid rulestring: {rulestring!r}.")
+
+    def lookup(self, alive: np.ndarray, neighs: np.ndarray) -> np.ndarray:
+        """ Next states of cells with given states and
+            neighbors counts (arrays of same shape).
+        """
+        return self.flat_table[9*alive + neighs]
+
+    def __str__(self) -> str:
+        return (
+            "B" + "".join(map(str, sorted(self.births)))
+            + "/S" + "".join(map(str, sorted(self.survivals)))
+        )
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}.parse({str(self)!r})"
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Rule):
+            return (
+                self.births == other.births
+                and self.survivals == other.survivals
+            )
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((self.births, self.survivals))
+
+
+CONWAY = Rule.parse("B3/S23")
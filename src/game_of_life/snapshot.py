@@ -0,0 +1,43 @@
+""" Immutable snapshots of game state, which are passed from simulation
+    thread to render thread without locks.
+"""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+
+class Snapshot(NamedTuple):
+    """ State of game at some generation. Cells array is read-only. """
+
+    generation: int
+    cells: np.ndarray
+    bounding_box: tuple[int, int, int, int]
+
+    @classmethod
+    def of(cls, cells, generation: int) -> "Snapshot":
+        """ Take snapshot of cells (any engine) at given generation. """
+
+        array = cells.live_cells()
+        array.flags.writeable = False
+        return cls(generation, array, cells.bounding_box)
+
+
+class SnapshotBuffer:
+    """ Holder of latest published snapshot. Snapshot is built
+        by simulation thread aside and then published by single reference
+        assignment, which is atomic, so neither publisher nor reader
+        ever waits for other one.
+    """
+
+    def __init__(self, snapshot: Optional[Snapshot] = None):
+        self.__latest = snapshot
+
+    @property
+    def latest(self) -> Optional[Snapshot]:
+        """ Latest published snapshot. """
+        return self.__latest
+
+    def publish(self, snapshot: Snapshot) -> None:
+        """ Make snapshot visible to readers. """
+        self.__latest = snapshot
@@ -0,0 +1,140 @@
+""" Sparse game of life engine, which work depends only on count of
+    alive cells and not on area they are spread over.
+"""
+
+from typing import Optional, Iterable
+
+import numpy as np
+
+from module_typing import Pos
+from .packed_state import PackedState, pack, unpack, unique_inverse
+from .rules import Rule, CONWAY
+
+# Offsets of neighbors in packed keys.
+_NEIGHBOR_OFFSETS = pack(np.array((
+    (-1, 0), (1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1),
+))) - pack(np.zeros((1, 2)))
+
+_LOW_MASK = (1 << 32) - 1
+
+
+class SparseCells:
+    """ Game of life engine that counts neighbors by scattering
+        alive cells to their neighbors. Has the same interface as Cells,
+        but states are PackedState.
+    """
+
+    def __init__(
+        self, lived_cells: Optional[Iterable[Pos]] = None,
+        rule: Rule = CONWAY,
+    ):
+        """ Give only cells that alive and other is dead. """
+
+        self.rule = rule
+        self.generation = 0
+
+        try:
+            self.current_state = PackedState(lived_cells)
+        except TypeError:
+            self.current_state = PackedState()
+
+        self.previous_state = PackedState()
+
+        # Keys of cells that were born and died at last generation.
+        self.births = np.empty(0, np.int64)
+        self.deaths = np.empty(0, np.int64)
+
+        keys = self.current_state.keys
+        if len(keys):
+            xs = keys & _LOW_MASK
+            self._x_range = (int(xs.min()), int(xs.max()))
+        else:
+            self._x_range = None
+        self.__update_bounding_box()
+
+    def live_cells(self) -> np.ndarray:
+        """ Return (N, 2) array of alive cells. """
+        return self.current_state.to_array()
+
+    @property
+    def population(self) -> int:
+        """ Count of alive cells. """
+        return len(self.current_state)
+
+    @property
+    def changes(self) -> np.ndarray:
+        """ Packed keys of cells born or died at last generation. """
+        return np.concatenate((self.births, self.deaths))
+
+    def step(self, n: int = 1) -> None:
+        """ Do next n iterations of game. """
+
+        for _ in range(n):
+            self.__step()
+        self.generation += n
+
+    def __step(self) -> None:
+
+        keys = self.current_state.keys
+        count = len(keys)
+
+        # Every alive cell adds one to each of its neighbors. Alive cells
+        # themselves are appended to know their current state.
+        scattered = np.concatenate(
+            [keys + offset for offset in _NEIGHBOR_OFFSETS] + [keys]
+        )
+        candidates, inverse = unique_inverse(scattered)
+
+        neighs = np.bincount(inverse[:8*count], minlength=len(candidates))
+        alive = np.zeros(len(candidates), bool)
+        alive[inverse[8*count:]] = True
+
+        new_alive = self.rule.lookup(alive, neighs)
+
+        self.previous_state = self.current_state
+        self.current_state = PackedState.from_keys(candidates[new_alive])
+        self.births = candidates[new_alive & ~alive]
+        self.deaths = candidates[alive & ~new_alive]
+
+        self.__update_x_range()
+        self.__update_bounding_box()
+
+    def __update_x_range(self) -> None:
+        """ Update range of x coordinates from births and deaths. Full pass
+            is done only if cells on boundary died.
+        """
+
+        keys = self.current_state.keys
+        if not len(keys):
+            self._x_range = None
+            return
+
+        born_xs = self.births & _LOW_MASK
+        died_xs = self.deaths & _LOW_MASK
+
+        if self._x_range is None or (
+            len(died_xs) and (
+                died_xs.min() <= self._x_range[0]
+                or died_xs.max() >= self._x_range[1]
+            )
+        ):
+            xs = keys & _LOW_MASK
+            self._x_range = (int(xs.min()), int(xs.max()))
+        elif len(born_xs):
+            self._x_range = (
+                min(self._x_range[0], int(born_xs.min())),
+                max(self._x_range[1], int(born_xs.max())),
+            )
+
+    def __update_bounding_box(self) -> None:
+        keys = self.current_state.keys
+        if not len(keys):
+            self.bounding_box = (0, 0, 0, 0)
+            return
+
+        # Keys are sorted by y, so y range is given by first and last keys.
+        (min_x, min_y), (max_x, max_y) = unpack(np.array((
+            (keys[0] & ~_LOW_MASK) + self._x_range[0],
+            (keys[-1] & ~_LOW_MASK) + self._x_range[1],
+        )))
+        self.bounding_box = (int(min_x), int(min_y), int(max_x), int(max_y))
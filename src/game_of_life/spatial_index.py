@@ -0,0 +1,122 @@
+""" Spatial index over alive cells for region queries,
+    e.g. for drawing only visible cells.
+"""
+
+import math
+from typing import Collection
+
+import numpy as np
+
+from module_typing import Pos
+from .packed_state import pack, unpack, state_to_keys
+
+_LOW_MASK = (1 << 32) - 1
+_X_BIAS = 1 << 31
+
+TileKey = tuple[int, int]
+
+
+class SpatialIndex:
+    """ Alive cells bucketed into square tiles. Every tile keeps sorted
+        packed keys of its cells. Index is updated by difference between
+        states, so that update cost depends on count of changed cells.
+    """
+
+    def __init__(self, tile_shift: int = 6):
+        """ tile_shift: tile side is 2^tile_shift cells. """
+
+        self.tile_shift = tile_shift
+        self.tiles: dict[TileKey, np.ndarray] = {}
+        self._keys = np.empty(0, np.int64)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def update(self, state: Collection[Pos]) -> None:
+        """ Update index to given state. """
+
+        keys = state_to_keys(state)
+        births = np.setdiff1d(keys, self._keys, assume_unique=True)
+        deaths = np.setdiff1d(self._keys, keys, assume_unique=True)
+        self._keys = keys
+
+        for tile, tile_keys in self.__group_by_tiles(deaths):
+            left = np.setdiff1d(
+                self.tiles[tile], tile_keys, assume_unique=True
+            )
+            if len(left):
+                self.tiles[tile] = left
+            else:
+                del self.tiles[tile]
+
+        for tile, tile_keys in self.__group_by_tiles(births):
+            old = self.tiles.get(tile)
+            self.tiles[tile] = (
+                tile_keys if old is None else np.union1d(old, tile_keys)
+            )
+
+    def query(
+        self, min_x: float, min_y: float, max_x: float, max_y: float
+    ) -> np.ndarray:
+        """ Return (N, 2) array of alive cells inside given
+            rectangle (including borders).
+        """
+
+        min_x, min_y = math.ceil(min_x), math.ceil(min_y)
+        max_x, max_y = math.floor(max_x), math.floor(max_y)
+        if min_x > max_x or min_y > max_y:
+            return np.empty((0, 2), np.int64)
+
+        s = self.tile_shift
+        tx0, ty0, tx1, ty1 = min_x >> s, min_y >> s, max_x >> s, max_y >> s
+
+        # Either look up every tile of rectangle or filter existing tiles,
+        # whichever is less.
+        if (tx1 - tx0 + 1) * (ty1 - ty0 + 1) <= len(self.tiles):
+            found = (
+                self.tiles.get((tx, ty))
+                for ty in range(ty0, ty1 + 1) for tx in range(tx0, tx1 + 1)
+            )
+        else:
+            found = (
+                keys for (tx, ty), keys in self.tiles.items()
+                if tx0 <= tx <= tx1 and ty0 <= ty <= ty1
+            )
+
+        found = [keys for keys in found if keys is not None]
+        if not found:
+            return np.empty((0, 2), np.int64)
+
+        cells = unpack(np.concatenate(found))
+        inside = (
+            (cells[:, 0] >= min_x) & (cells[:, 0] <= max_x)
+            & (cells[:, 1] >= min_y) & (cells[:, 1] <= max_y)
+        )
+        return cells[inside]
+
+    def count(
+        self, min_x: float, min_y: float, max_x: float, max_y: float
+    ) -> int:
+        """ Count alive cells inside given rectangle. """
+        return len(self.query(min_x, min_y, max_x, max_y))
+
+    def __group_by_tiles(self, keys: np.ndarray):
+        """ Yield tile and sorted keys of its cells for every tile
+            that has any of given cells.
+        """
+
+        if not len(keys):
+            return
+
+        tx = ((keys & _LOW_MASK) - _X_BIAS) >> self.tile_shift
+        ty = keys >> (32 + self.tile_shift)
+
+        # Tiles are runs of sorted packed keys of tiles, and stable sort
+        # keeps keys of every tile sorted.
+        tile_keys = pack(np.stack((tx, ty), axis=1))
+        order = np.argsort(tile_keys, kind="stable")
+        bounds = np.flatnonzero(np.diff(tile_keys[order])) + 1
+
+        for part in np.split(order, bounds):
+            x, y = unpack(tile_keys[part[:1]])[0].tolist()
+            yield (x, y), keys[part]
@@ -0,0 +1,200 @@
+""" Tiled game of life engine, that recomputes only tiles
+    where something happens.
+"""
+
+from typing import Optional, Iterable
+
+import numpy as np
+
+from module_typing import GameState, Pos
+from .dense import neighbors_count
+from .rules import Rule, CONWAY
+from .packed_state import cells_to_array, pack, unpack
+
+TileKey = tuple[int, int]
+
+
+def _halo_slices(size: int) -> tuple:
+    """ For every neighbor tile offset return slices of halo'd block
+        to copy to and slices of neighbor tile to copy from.
+    """
+
+    # For each offset: destination and source slice along one axis.
+    axis = {
+        -1: (slice(0, 1), slice(size - 1, size)),
+        0: (slice(1, size + 1), slice(0, size)),
+        1: (slice(size + 1, size + 2), slice(0, 1)),
+    }
+
+    return tuple(
+        (dx, dy, (axis[dy][0], axis[dx][0]), (axis[dy][1], axis[dx][1]))
+        for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+    )
+
+
+class TiledCells:
+    """ Game of life engine that splits plane into square tiles and
+        recomputes only tiles that changed last generation and their
+        neighbors. Empty tiles are freed. Has the same interface as Cells.
+    """
+
+    def __init__(
+        self, lived_cells: Optional[Iterable[Pos]] = None,
+        rule: Rule = CONWAY, tile_size: int = 64,
+    ):
+        """ Give only cells that alive and other is dead. """
+
+        self.rule = rule
+        self.generation = 0
+        self.tile_size = tile_size
+        self._halo_slices = _halo_slices(tile_size)
+        self._tiles: dict[TileKey, np.ndarray] = {}
+
+        coords = cells_to_array(lived_cells)
+
+        # Cells are grouped by tiles as runs of sorted packed keys
+        # of tiles.
+        tile_keys = pack(coords // tile_size)
+        order = np.argsort(tile_keys, kind="stable")
+        bounds = np.flatnonzero(np.diff(tile_keys[order])) + 1
+        local = coords % tile_size
+        for part in np.split(order, bounds) if len(order) else ():
+            tx, ty = unpack(tile_keys[part[:1]])[0].tolist()
+            tile = np.zeros((tile_size, tile_size), np.uint8)
+            cells = local[part]
+            tile[cells[:, 1], cells[:, 0]] = 1
+            self._tiles[(tx, ty)] = tile
+
+        # Tiles that changed last generation.
+        self._active: set[TileKey] = set(self._tiles)
+        self._bounding_box = None
+
+        # Keys, old and new states of tiles changed last generation,
+        # from which keys of changed cells are computed on demand.
+        self._last_step: Optional[tuple] = None
+        self._changes: Optional[np.ndarray] = None
+
+    @property
+    def current_state(self) -> GameState:
+        """ Set of alive cells. """
+
+        cells = self.live_cells()
+        return set(zip(cells[:, 0].tolist(), cells[:, 1].tolist()))
+
+    def live_cells(self) -> np.ndarray:
+        """ Return (N, 2) array of alive cells. """
+
+        cells = [np.empty((0, 2), np.int64)]
+        for (tx, ty), tile in self._tiles.items():
+            ys, xs = np.nonzero(tile)
+            cells.append(np.stack(
+                (xs + tx*self.tile_size, ys + ty*self.tile_size), axis=1
+            ))
+
+        return np.concatenate(cells)
+
+    @property
+    def bounding_box(self) -> tuple[int, int, int, int]:
+        """ Bounding box of alive cells as (min_x, min_y, max_x, max_y). """
+
+        if self._bounding_box is None:
+            self._bounding_box = self.__compute_bounding_box()
+        return self._bounding_box
+
+    @property
+    def population(self) -> int:
+        """ Count of alive cells. """
+        return sum(int(np.count_nonzero(t)) for t in self._tiles.values())
+
+    @property
+    def changes(self) -> Optional[np.ndarray]:
+        """ Packed keys of cells born or died at last generation,
+            None before first generation.
+        """
+
+        if self._changes is None and self._last_step is not None:
+            keys, old, new = self._last_step
+            idx, ys, xs = np.nonzero(old != new)
+            offsets = np.array(keys, np.int64).reshape(-1, 2)
+            offsets *= self.tile_size
+            self._changes = pack(np.stack(
+                (xs + offsets[idx, 0], ys + offsets[idx, 1]), axis=1
+            ))
+        return self._changes
+
+    @property
+    def active_tiles(self) -> int:
+        """ Count of tiles that changed last generation. """
+        return len(self._active)
+
+    def step(self, n: int = 1) -> None:
+        """ Do next n iterations of game. """
+
+        for _ in range(n):
+            self.__step()
+        self.generation += n
+
+    def __step(self) -> None:
+
+        candidates = list({
+            (tx + dx, ty + dy)
+            for tx, ty in self._active
+            for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+        })
+        if not candidates:
+            self._last_step = None
+            self._changes = np.empty(0, np.int64)
+            return
+
+        size = self.tile_size
+        blocks = np.zeros((len(candidates), size + 2, size + 2), np.uint8)
+        for block, (tx, ty) in zip(blocks, candidates):
+            for dx, dy, dst, src in self._halo_slices:
+                tile = self._tiles.get((tx + dx, ty + dy))
+                if tile is not None:
+                    block[dst] = tile[src]
+
+        counts = neighbors_count(blocks)
+        inner = blocks[:, 1:-1, 1:-1]
+
+        new = self.rule.lookup(inner, counts).view(np.uint8)
+
+        changed = np.flatnonzero((new != inner).any(axis=(1, 2)))
+        not_empty = new.any(axis=(1, 2))
+
+        self._last_step = (
+            [candidates[idx] for idx in changed.tolist()],
+            inner[changed], new[changed],
+        )
+        self._changes = None
+
+        self._active = set()
+        for idx in changed.tolist():
+            key = candidates[idx]
+            self._active.add(key)
+            if not_empty[idx]:
+                self._tiles[key] = new[idx].copy()
+            else:
+                del self._tiles[key]
+
+        if self._active:
+            self._bounding_box = None
+
+    def __compute_bounding_box(self) -> tuple[int, int, int, int]:
+        if not self._tiles:
+            return (0, 0, 0, 0)
+
+        boxes = []
+        for (tx, ty), tile in self._tiles.items():
+            rows = np.flatnonzero(tile.any(axis=1))
+            cols = np.flatnonzero(tile.any(axis=0))
+            boxes.append((
+                tx*self.tile_size + cols[0], ty*self.tile_size + rows[0],
+                tx*self.tile_size + cols[-1], ty*self.tile_size + rows[-1],
+            ))
+
+        boxes = np.array(boxes)
+        return (
+            int(boxes[:, 0].min()), int(boxes[:, 1].min()),
+            int(boxes[:, 2].max()), int(boxes[:, 3].max()),
+        )
@@ -0,0 +1,42 @@
+""" View and projection matrices of game, shared by OpenGL renderer
+    and offscreen export, so that both show the same picture.
+"""
+
+import numpy as np
+
+
+def projection_matrix(width: int, height: int) -> np.matrix:
+    """ Projection of viewport with given size in pixels, which keeps
+        cells square: view square [0, 1] x [0, 1] fits the smaller side.
+    """
+
+    min_dim = min(width, height)
+    return np.matrix((
+        (2*min_dim / width, 0, 0, -1),
+        (0, 2*min_dim / height, 0, -1),
+        (0, 0, 1, 0),
+        (0, 0, 0, 1),
+    ), dtype=np.float32)
+
+
+def fit_view_matrix(
+    bounding_box: tuple[int, int, int, int], side_scale: float,
+) -> np.matrix:
+    """ View matrix that fits bounding box into view square, which side
+        is side_scale times bigger than the longer side of box.
+    """
+
+    bnd_box = bounding_box
+
+    a = side_scale * max(bnd_box[2] - bnd_box[0], bnd_box[3] - bnd_box[1])
+    # Single cell or empty state has box of zero size.
+    a = a or side_scale
+    t_x = (bnd_box[2] + bnd_box[0] - a) / 2
+    t_y = (bnd_box[3] + bnd_box[1] - a) / 2
+
+    return np.matrix((
+        (1/a, 0, 0, -t_x/a),
+        (0, 1/a, 0, -t_y/a),
+        (0, 0, 1, 0),
+        (0, 0, 0, 1),
+    ), np.float32)
@@ -7,6 +7,7 @@ import numpy as np
 # Will be modified later.
 proj_matrix = None
 i_proj_matrix = None
+viewport_size = None
 
 FPS: Final = 50
 FRAME_PERIOD: Final = 1/FPS
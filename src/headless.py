@@ -0,0 +1,246 @@
+""" Headless runner of game of life patterns, e.g. for batch nodes
+    without display. Doesn't import Qt or OpenGL.
+
+    Example:
+        python src/headless.py tests/sir_robin.rle -e sparse -n 1000
+"""
+
+import argparse
+import sys
+import time
+
+from game_of_life import (
+    HashLife, Rule, ENGINES, EnginePolicy, create_engine,
+    parse_rle_array, parse_rle_rule, write_rle,
+)
+from game_of_life.engine import engine_name
+from game_of_life.cycles import (
+    REHASH_INTERVAL, CycleDetector, fast_forward,
+)
+from game_of_life.checkpoint import (
+    is_checkpoint, load_checkpoint, save_checkpoint,
+)
+from game_of_life.export import Exporter, Rasterizer, open_writer
+
+
+def parse_size(text: str) -> tuple[int, int]:
+    """ Parse size like 640x480. """
+
+    try:
+        width, height = map(int, text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size {text!r}") from None
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"invalid size {text!r}")
+    return width, height
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """ Parse command line arguments. """
+
+    parser = argparse.ArgumentParser(
+        description="Run game of life pattern without GUI."
+    )
+    parser.add_argument("rle", help="path to RLE file or checkpoint")
+    parser.add_argument(
+        "-e", "--engine", choices=ENGINES, default="sparse",
+        help="engine to step cells with (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-a", "--auto", action="store_true",
+        help="switch engine by density and activity of pattern, "
+             "starting with --engine",
+    )
+    parser.add_argument(
+        "-n", "--generations", type=int, default=None,
+        help="count of generations to run",
+    )
+    parser.add_argument(
+        "-t", "--time", type=float, default=None,
+        help="wall-clock budget in seconds",
+    )
+    parser.add_argument(
+        "-r", "--rule", type=Rule.parse, default=None,
+        help="rule like B3/S23, overrides rule of RLE file",
+    )
+    parser.add_argument(
+        "-o", "--output", default=None,
+        help="path to write final state as RLE",
+    )
+    parser.add_argument(
+        "-k", "--checkpoint", default=None,
+        help="path to write final state as binary checkpoint",
+    )
+    parser.add_argument(
+        "-c", "--cycles", action="store_true",
+        help="detect period of pattern and fast-forward once it's found",
+    )
+    parser.add_argument(
+        "-f", "--frames", default=None,
+        help="export frames to animated GIF (path ends with .gif) or "
+             "PNG files (path is pattern like frames/{:05d}.png)",
+    )
+    parser.add_argument(
+        "--size", type=parse_size, default=(512, 512),
+        help="size of frames in pixels (default: 512x512)",
+    )
+    parser.add_argument(
+        "--every", type=int, default=1,
+        help="export every n-th generation (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--fps", type=float, default=25,
+        help="frame rate of GIF (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--refit", action="store_true",
+        help="fit view to pattern at every frame, not only at the first",
+    )
+
+    args = parser.parse_args(argv)
+    if args.generations is None and args.time is None:
+        parser.error("at least one of --generations and --time is required")
+
+    return args
+
+
+def run(
+    cells, generations=None, budget=None, cycles=None, policy=None,
+    callback=None,
+):
+    """ Step cells until count of generations is done or time budget is
+        over, whichever is first. If cycle detector is given, generations
+        are fast-forwarded once cycle is detected. If engine policy is
+        given, engine is switched to one it chooses, and generations
+        are stepped by batches between its evaluations, unless cycle
+        detector or callback needs every one of them. Callback is called
+        with engine and count of done generations after every stepped
+        generation. Returns engine (which is new one if it was
+        fast-forwarded with translation or switched) and count of done
+        generations.
+    """
+
+    if budget is None and cycles is None and policy is None \
+            and callback is None and isinstance(cells, HashLife):
+        cells.step(generations)
+        return cells, generations
+
+    deadline = None if budget is None else time.perf_counter() + budget
+    done = 0
+    if cycles is not None:
+        cycles.observe(cells, done)
+
+    while generations is None or done < generations:
+        if cycles is not None and cycles.cycle is not None:
+            if generations is None:
+                break
+            cells, done = fast_forward(
+                cells, cycles.cycle, done, generations
+            )
+            if done == generations:
+                break
+            # Hashes collided, state doesn't really repeat.
+            cycles.reset()
+            cycles.observe(cells, done)
+
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        # Without policy or when every generation is observed, cells
+        # are stepped by one generation, otherwise by batch up to next
+        # evaluation of policy.
+        if policy is None:
+            count = 1
+            cells.step()
+        else:
+            count = 1 if cycles is not None or callback is not None \
+                else policy.interval - done % policy.interval
+            if generations is not None:
+                count = min(count, generations - done)
+            cells = policy.step(cells, done, count)
+        done += count
+        if cycles is not None:
+            cycles.observe(cells, done)
+        if callback is not None:
+            callback(cells, done)
+
+    return cells, done
+
+
+def main(argv=None) -> None:
+    """ Entry point of headless runner. """
+
+    args = parse_args(argv)
+
+    start = time.perf_counter()
+    if is_checkpoint(args.rle):
+        checkpoint = load_checkpoint(args.rle)
+        rule = args.rule or checkpoint.rule
+        first = checkpoint.generation
+        cells = create_engine(args.engine, checkpoint.cells, rule)
+    else:
+        rule = args.rule or parse_rle_rule(args.rle)
+        first = 0
+        cells = create_engine(args.engine, parse_rle_array(args.rle), rule)
+    load_time = time.perf_counter() - start
+
+    cycles = (
+        CycleDetector(interval=REHASH_INTERVAL) if args.cycles else None
+    )
+    exporter = None
+    if args.frames is not None:
+        exporter = Exporter(
+            open_writer(args.frames, *args.size, fps=args.fps),
+            Rasterizer(*args.size), args.every, refit=args.refit,
+        )
+        exporter(cells, 0)
+    # Cycles and frames need every generation, so that tree-based
+    # engine would be stepped by one generation.
+    policy = None
+    if args.auto:
+        batched = cycles is None and exporter is None
+        policy = EnginePolicy(
+            tree="hashlife" if batched else None,
+            observed=cycles is not None,
+        )
+
+    start = time.perf_counter()
+    cells, done = run(
+        cells, args.generations, args.time, cycles, policy, exporter
+    )
+    elapsed = time.perf_counter() - start
+    if exporter is not None:
+        exporter.close()
+
+    print(f"engine:       {engine_name(cells)}")
+    print(f"rule:         {rule}")
+    print(f"load time:    {load_time:.3f} s")
+    print(f"generations:  {done} (last is {first + done})")
+    print(f"elapsed:      {elapsed:.3f} s")
+    print(f"speed:        {done / elapsed if elapsed else float('inf'):.1f}"
+          " gen/s")
+    print(f"population:   {cells.population}")
+    print(f"bounding box: {tuple(map(int, cells.bounding_box))}")
+    if exporter is not None:
+        print(f"frames:       {exporter.writer.frames}")
+    if cycles is not None:
+        cycle = cycles.cycle
+        print("cycle:        " + (
+            f"period {cycle.period} from generation {cycle.start}, "
+            f"displacement {cycle.displacement}" if cycle else "not found"
+        ))
+
+    if args.output is not None:
+        write_rle(args.output, cells.live_cells(), rule)
+    if args.checkpoint is not None:
+        save_checkpoint(
+            args.checkpoint, cells.live_cells(), rule, first + done,
+            cells.bounding_box,
+        )
+
+    close = getattr(cells, "close", None)
+    if close is not None:
+        close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,7 +13,11 @@ from PySide6.QtCore import QPoint, Qt
 from PySide6.QtGui import QWheelEvent, QCursor, QMouseEvent
 
 import globals    # pylint: disable=W0622
-from game_of_life import Cells, Renderer, GameOfLife, parse_rle
+from game_of_life import (
+    Renderer, GameOfLife, EnginePolicy, create_engine,
+    parse_rle_array, parse_rle_rule,
+)
+from game_of_life.view import projection_matrix
 from module_typing import Hz
 from utils import MutexVar
 
@@ -48,6 +52,10 @@ class MainGlWidget(QOpenGLWidget):
         self.fade_shader = self.__create_shader_prog(
             "src/shaders/fade_vertex.glsl", "src/shaders/fade_fragment.glsl"
         )
+        self.density_shader = self.__create_shader_prog(
+            "src/shaders/density_vertex.glsl",
+            "src/shaders/density_fragment.glsl",
+        )
 
         self.__create_matricies()
 
@@ -62,11 +70,20 @@ class MainGlWidget(QOpenGLWidget):
         glEnable(GL_BLEND)
 
     def __create_game(self, rle_path: str) -> None:
-        lived_cells = parse_rle(rle_path)
+        lived_cells = parse_rle_array(rle_path)
 
-        self.cells = Cells(lived_cells)
-        self.renderer = Renderer(self.cells, self.cell_shader)
-        self.game = GameOfLife(self.cells, self.renderer)
+        self.cells = create_engine(
+            "sparse", lived_cells, parse_rle_rule(rle_path)
+        )
+        self.renderer = Renderer(
+            self.cells, self.cell_shader, self.density_shader, culling=True
+        )
+        # Game (and its precompute worker) observes every generation
+        # to detect cycles.
+        self.game = GameOfLife(
+            self.cells, self.renderer, precompute=64,
+            policy=EnginePolicy(observed=True),
+        )
 
         self.game.fit_view(1.2)
         self.game.start_threads()
@@ -74,11 +91,11 @@ class MainGlWidget(QOpenGLWidget):
     def restart_game(self, rle_path: str) -> None:
         """ Restart game. """
 
-        lived_cells = parse_rle(rle_path)
-        self.game.cells.inner = Cells(lived_cells)
-        self.game.renderer.cells = self.game.grid.inner
-        self.game.renderer.should_update_instance_vbo.inner = True
+        lived_cells = parse_rle_array(rle_path)
         self.game.stop()
+        self.game.set_cells(create_engine(
+            "sparse", lived_cells, parse_rle_rule(rle_path)
+        ))
 
     def __create_shader_prog(self, vertex_path, fragment_path) -> int:
         with open(vertex_path, encoding="utf-8") as src:
@@ -92,14 +109,9 @@ class MainGlWidget(QOpenGLWidget):
 
     def __create_matricies(self) -> None:
         # Project matrix to keep up squareness.
-        min_dim = min(self.width(), self.height())
-        globals.proj_matrix = np.matrix((
-            (2*min_dim / self.width(), 0, 0, -1),
-            (0, 2*min_dim / self.height(), 0, -1),
-            (0, 0, 1, 0),
-            (0, 0, 0, 1),
-        ), dtype=np.float32)
+        globals.proj_matrix = projection_matrix(self.width(), self.height())
         globals.i_proj_matrix = globals.proj_matrix.I
+        globals.viewport_size = (self.width(), self.height())
 
         # Matrix to convert windows coordinates to homogeneous one.
         self.__win_to_homo = np.matrix((
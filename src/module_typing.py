@@ -1,8 +1,8 @@
 """ Module level typing (type aliases). """
 
-from OpenGL.GL import GLuint
-
 Pos = tuple[int, int]
 GameState = set[Pos]
-ShaderProgram = GLuint
+# Name of OpenGL program object, i.e. GLuint. Plain int is used, so that
+# engines don't depend on OpenGL and run headless.
+ShaderProgram = int
 Hz = float
@@ -0,0 +1,11 @@
+#version 330 core
+in vec2 uv;
+out vec4 FragColor;
+
+uniform sampler2D density;
+
+void main() {
+    // Even single cell per pixel must stay visible.
+    float d = texture(density, uv).r;
+    FragColor = vec4(0.1, 0.1, 0.1, d > 0. ? max(d, 0.3) : 0.);
+}
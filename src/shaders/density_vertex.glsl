@@ -0,0 +1,15 @@
+#version 330 core
+layout (location=0) in vec2 aPos;
+
+uniform mat4 proj_matrix;
+uniform mat4 view_matrix;
+
+// Covered rectangle as (x, y, width, height).
+uniform vec4 rect;
+
+out vec2 uv;
+
+void main() {
+    uv = aPos;
+    gl_Position = proj_matrix * view_matrix * vec4(rect.xy + aPos * rect.zw, 0.0, 1.0);
+}
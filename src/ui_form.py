@@ -68,7 +68,7 @@ class Ui_Widget(object):
         self.frequencySlider = QSlider(Widget)
         self.frequencySlider.setObjectName(u"frequencySlider")
         self.frequencySlider.setMinimum(1)
-        self.frequencySlider.setMaximum(50)
+        self.frequencySlider.setMaximum(51)
         self.frequencySlider.setValue(5)
         self.frequencySlider.setOrientation(Qt.Horizontal)
 
@@ -1,8 +1,9 @@
 """ Useful utilities for module. """
 
+import math
 import threading
 import time
-from typing import TypeVar, Generic, Callable
+from typing import TypeVar, Generic, Callable, Optional
 
 T = TypeVar("T")
 
@@ -58,3 +59,112 @@ class PeriodicLoop(threading.Thread):
         if self.__frequency != freq:
             self.period.inner = 1/freq
             self.sleep_event.set()
+
+
+class AdaptiveLoop(threading.Thread):
+    """ Makes loop in individual thread that calls func(n) to advance
+        n generations, so that requested count of generations per second
+        is reached. Cost of one generation is measured, and generations
+        are batched, so that func is called at most once per frame
+        period, but batch takes no longer than frame period either.
+        func returns count of generations it actually advanced.
+        Infinite frequency means as fast as possible.
+    """
+
+    def __init__(
+        self, frequency: float, frame_period: float,
+        func: Callable[[int], Optional[int]],
+    ):
+        super().__init__()
+
+        self.sleep_event = threading.Event()
+        self.func = func
+        self.frame_period = frame_period
+        self.frequency = MutexVar(frequency)
+
+        # Exponential moving average of seconds per generation.
+        self.step_cost = 0.0
+
+        self.__achieved = 0.0
+        self.__window_start = time.perf_counter()
+        self.__window_count = 0
+
+    @property
+    def requested_frequency(self) -> float:
+        """ Requested generations per second. """
+        return self.frequency.inner
+
+    @property
+    def achieved_frequency(self) -> float:
+        """ Generations per second actually done during last second. """
+        return self.__achieved
+
+    def set_frequency(self, freq: float) -> None:
+        """ Set update frequency. """
+        if self.frequency.inner != freq:
+            self.frequency.inner = freq
+            self.sleep_event.set()
+
+    def run(self):
+        # Generations owed by schedule, but not done yet.
+        debt = 0.0
+        last = time.perf_counter()
+
+        while True:
+            freq = self.frequency.inner
+            now = time.perf_counter()
+            debt += (now - last) * freq if math.isfinite(freq) else math.inf
+            last = now
+
+            # Count of generations that fits into frame period.
+            budget = max(int(self.frame_period / self.step_cost), 1) \
+                if self.step_cost > 0 else 1
+            count = int(min(debt, budget))
+
+            elapsed = 0.0
+            done = 0
+            if count > 0:
+                start = time.perf_counter()
+                done = self.func(count)
+                elapsed = time.perf_counter() - start
+                done = count if done is None else done
+
+            if done > 0:
+                cost = elapsed / done
+                self.step_cost = cost if self.step_cost == 0 \
+                    else 0.8*self.step_cost + 0.2*cost
+                # Backlog beyond one batch is dropped, so that simulation
+                # doesn't race to catch up after slow period.
+                debt = min(debt - done, budget)
+            elif count > 0 or freq == 0:
+                # Paused or stopped, nothing is owed. Otherwise debt is
+                # less than one generation and is kept, so that low
+                # frequencies don't lose generations.
+                debt = 0.0
+            self.__count_achieved(done)
+
+            if freq == 0:
+                # Stopped until frequency is changed.
+                wait = None
+            elif math.isfinite(freq):
+                wait = max((1 - debt) / freq, self.frame_period - elapsed)
+            elif done > 0:
+                wait = 0.0
+            else:
+                wait = self.frame_period
+
+            if wait is None or wait > 0:
+                self.sleep_event.wait(wait)
+            self.sleep_event.clear()
+            if wait is None:
+                # Time being stopped isn't owed at new frequency.
+                last = time.perf_counter()
+
+    def __count_achieved(self, done: int) -> None:
+        self.__window_count += done
+
+        now = time.perf_counter()
+        if now - self.__window_start >= 1:
+            self.__achieved = self.__window_count / (now - self.__window_start)
+            self.__window_start = now
+            self.__window_count = 0
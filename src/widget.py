@@ -1,5 +1,6 @@
 """ Main Qt widget and file as well. """
 
+import math
 import sys
 
 from PySide6.QtWidgets import QApplication, QWidget, QPushButton, QHBoxLayout
@@ -37,11 +38,15 @@ class Widget(QWidget):
         timer.timeout.connect(self.main_gl_widget.repaint)
         timer.start()
 
+        # Show achieved frequency, which may be lower than requested one.
+        freq_timer = QTimer(self)
+        freq_timer.setInterval(500)
+        freq_timer.timeout.connect(self.__update_frequency_label)
+        freq_timer.start()
+
     def __connect_signals(self) -> None:
         self.ui.toggleButton.clicked.connect(self.__toggle_button_clicked)
-        self.ui.rewindButton.clicked.connect(
-            lambda: self.main_gl_widget.restart_game(globals.TEST_RLE)
-        )
+        self.ui.rewindButton.clicked.connect(self.__rewind_button_clicked)
 
         self.ui.frequencySlider.valueChanged.connect(
             self.__freqency_slider_val_changed
@@ -52,9 +57,33 @@ class Widget(QWidget):
         self.ui.toggleButton.setText(idk[self.ui.toggleButton.text()])
         self.main_gl_widget.toggle_game()
 
+    def __rewind_button_clicked(self) -> None:
+        # Go back by one second of playback.
+        updater = self.main_gl_widget.game.updater
+        freq = updater.requested_frequency
+        if math.isinf(freq):
+            freq = updater.achieved_frequency
+
+        self.main_gl_widget.game.rewind(max(round(freq), 1))
+
     def __freqency_slider_val_changed(self, freq: int) -> None:
+        # Maximum of slider means as fast as possible.
+        if freq == self.ui.frequencySlider.maximum():
+            freq = math.inf
+
         self.main_gl_widget.game.updater.set_frequency(freq)
-        self.ui.frequencyLabel.setText(f"{freq}/s")
+        self.__update_frequency_label()
+
+    def __update_frequency_label(self) -> None:
+        updater = self.main_gl_widget.game.updater
+        requested = updater.requested_frequency
+        requested = "max" if math.isinf(requested) else f"{requested:g}"
+
+        if self.main_gl_widget.game.should_update.inner:
+            achieved = f"{updater.achieved_frequency:.0f}"
+            self.ui.frequencyLabel.setText(f"{achieved}/{requested}/s")
+        else:
+            self.ui.frequencyLabel.setText(f"{requested}/s")
 
 
 if __name__ == "__main__":
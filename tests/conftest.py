@@ -0,0 +1,7 @@
+""" Make sources importable by tests. """
+
+import pathlib
+import sys
+
+SRC = pathlib.Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC))
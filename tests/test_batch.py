@@ -0,0 +1,12 @@
+""" Retiring of soups by BatchCells. """
+
+from game_of_life import BatchCells
+
+
+def test_run_keeps_surplus_results():
+    split = BatchCells(64, seed=3)
+    whole = BatchCells(64, seed=3)
+
+    numbers = [result.number for _ in range(10) for result in split.run(7)]
+    assert numbers == [result.number for result in whole.run(70)]
+    assert len(set(numbers)) == 70
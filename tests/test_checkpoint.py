@@ -0,0 +1,46 @@
+""" Round trips of game states through checkpoints. """
+
+import numpy as np
+import pytest
+
+from game_of_life import Rule, load_checkpoint, save_checkpoint
+from game_of_life.checkpoint import is_checkpoint, save_checkpoint_async
+
+
+def test_checkpoint_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    cells = rng.integers(-1000, 1000, (5000, 2))
+    box = (*cells.min(axis=0).tolist(), *cells.max(axis=0).tolist())
+    path = str(tmp_path / "game.ckpt")
+
+    save_checkpoint(path, cells, Rule.parse("B36/S23"), 12345, box)
+
+    assert is_checkpoint(path)
+    checkpoint = load_checkpoint(path)
+    assert checkpoint.generation == 12345
+    assert checkpoint.rule == Rule.parse("B36/S23")
+    assert checkpoint.bounding_box == box
+    np.testing.assert_array_equal(checkpoint.cells, cells)
+    assert not checkpoint.cells.flags.writeable
+
+
+def test_empty_checkpoint(tmp_path):
+    path = str(tmp_path / "empty.ckpt")
+    save_checkpoint_async(
+        path, set(), Rule.parse("B2/S"), 7, (0, 0, 0, 0)
+    ).join()
+
+    checkpoint = load_checkpoint(path)
+    assert checkpoint.generation == 7
+    assert checkpoint.rule == Rule.parse("B2/S")
+    assert checkpoint.bounding_box == (0, 0, 0, 0)
+    assert checkpoint.cells.shape == (0, 2)
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "game.rle"
+    path.write_text("x = 3, y = 1\n3o!" + " " * 64)
+
+    assert not is_checkpoint(str(path))
+    with pytest.raises(ValueError):
+        load_checkpoint(str(path))
@@ -0,0 +1,63 @@
+""" Fast-forward of cycled patterns. """
+
+import numpy as np
+import pytest
+
+from game_of_life import Cycle, CycleDetector, create_engine, fast_forward
+
+GLIDER = ((1, 0), (2, 1), (0, 2), (1, 2), (2, 2))
+
+
+def _sorted(cells: np.ndarray) -> np.ndarray:
+    return cells[np.lexsort((cells[:, 0], cells[:, 1]))]
+
+
+@pytest.mark.parametrize("name", ("sparse", "bitpacked", "mapped"))
+def test_fast_forward_matches_stepping(name):
+    cells = create_engine(name, GLIDER)
+    reference = create_engine("sparse", GLIDER)
+    detector = CycleDetector()
+    generation = 0
+    detector.observe(cells, generation)
+    while detector.cycle is None:
+        cells.step()
+        generation += 1
+        detector.observe(cells, generation)
+
+    cells, generation = fast_forward(cells, detector.cycle, generation, 1003)
+    reference.step(1003)
+    try:
+        assert generation == 1003
+        assert cells.generation == 1003
+        np.testing.assert_array_equal(
+            _sorted(cells.live_cells()), _sorted(reference.live_cells())
+        )
+    finally:
+        close = getattr(cells, "close", None)
+        if close is not None:
+            close()
+
+
+def test_false_cycle_is_not_fast_forwarded():
+    cells = create_engine("sparse", GLIDER)
+    # Glider has period 4, so state doesn't repeat after 3 generations.
+    cells, generation = fast_forward(cells, Cycle(0, 3, (0, 0)), 0, 99)
+    assert generation == 3
+    assert cells.generation == 3
+
+
+def test_detector_hashes_changes_and_samples_moving_states():
+    still = create_engine("dense", ((0, 0), (1, 0), (0, 1), (1, 1)))
+    detector = CycleDetector(interval=16)
+    detector.observe(still, 0)
+    still.step()
+    # Changes of engine are hashed incrementally at every generation.
+    assert detector.observe(still, 1) == Cycle(0, 1, (0, 0))
+
+    glider = create_engine("dense", GLIDER)
+    detector = CycleDetector(interval=16)
+    for generation in range(40):
+        detector.observe(glider, generation)
+        glider.step()
+    # Moving state is hashed only every interval generations.
+    assert detector.cycle == Cycle(0, 16, (4, 4))
@@ -0,0 +1,123 @@
+""" Cross-check of engines against reference Cells on test patterns. """
+
+import functools
+import pathlib
+
+import numpy as np
+import pytest
+
+from game_of_life import (
+    Rule, Cells, EnginePolicy, HashLife, ParallelCells, TiledCells,
+    parse_rle, create_engine, create_like,
+)
+from game_of_life.packed_state import state_to_keys
+
+PATTERNS = sorted(pathlib.Path(__file__).parent.glob("*.rle"))
+RULES = ("B3/S23", "B36/S23", "B2/S")
+ENGINES = (
+    "bitpacked", "dense", "tiled", "parallel", "hashlife", "mapped",
+    "sparse",
+)
+# Engines that record cells changed by last generation.
+CHANGES_ENGINES = (
+    "bitpacked", "dense", "tiled", "parallel", "mapped", "sparse",
+)
+# Engines are compared after every count of generations, so that both
+# single and batched steps are checked.
+STEPS = (1, 1, 2, 4, 8, 16)
+
+
+def _sorted(cells: np.ndarray) -> np.ndarray:
+    cells = np.asarray(cells, np.int64).reshape(-1, 2)
+    return cells[np.lexsort((cells[:, 0], cells[:, 1]))]
+
+
+@functools.cache
+def _reference(path: pathlib.Path, rule: str) -> list[tuple]:
+    """ Generation, population, bounding box and cells of Cells
+        after every count of STEPS. Cells is slow, so it's shared
+        by all engines.
+    """
+
+    cells = Cells(parse_rle(str(path)), Rule.parse(rule))
+    results = []
+    for n in (0, *STEPS):
+        cells.step(n)
+        results.append((
+            cells.generation, cells.population, tuple(cells.bounding_box),
+            _sorted(cells.live_cells()),
+        ))
+    return results
+
+
+def _assert_same(engine, expected: tuple) -> None:
+    generation, population, bounding_box, cells = expected
+    assert engine.generation == generation
+    assert engine.population == population
+    assert tuple(engine.bounding_box) == bounding_box
+    np.testing.assert_array_equal(_sorted(engine.live_cells()), cells)
+
+
+@pytest.mark.parametrize("rule", RULES)
+@pytest.mark.parametrize("path", PATTERNS, ids=lambda path: path.stem)
+@pytest.mark.parametrize("name", ENGINES)
+def test_engine_matches_cells(name, path, rule):
+    expected = _reference(path, rule)
+    engine = create_engine(name, parse_rle(str(path)), Rule.parse(rule))
+    try:
+        _assert_same(engine, expected[0])
+        for n, state in zip(STEPS, expected[1:]):
+            engine.step(n)
+            _assert_same(engine, state)
+    finally:
+        close = getattr(engine, "close", None)
+        if close is not None:
+            close()
+
+
+@pytest.mark.parametrize("name", CHANGES_ENGINES)
+def test_changes_are_born_and_died_cells(name):
+    path = pathlib.Path(__file__).parent / "p18_glider_shuttle.rle"
+    engine = create_engine(name, parse_rle(str(path)))
+    try:
+        before = state_to_keys(engine.live_cells())
+        for _ in range(20):
+            engine.step()
+            after = state_to_keys(engine.live_cells())
+            np.testing.assert_array_equal(
+                np.sort(engine.changes), np.setxor1d(before, after)
+            )
+            before = after
+    finally:
+        close = getattr(engine, "close", None)
+        if close is not None:
+            close()
+
+
+def test_observed_policy_chooses_engines_recording_changes():
+    policy = EnginePolicy(observed=True)
+    assert policy.tree is None
+    with pytest.raises(ValueError):
+        EnginePolicy(dense="cells", observed=True)
+
+
+def test_create_like_keeps_options():
+    tiled = create_like(TiledCells(rule=Rule.parse("B36/S23"), tile_size=16))
+    assert tiled.tile_size == 16
+    assert tiled.rule == Rule.parse("B36/S23")
+
+    engine = ParallelCells(((0, 0), (1, 0), (2, 0)), processes=2)
+    copy = create_like(engine, engine.live_cells() + 5)
+    try:
+        assert copy.processes == 2
+        assert copy.bounding_box == (5, 5, 7, 5)
+    finally:
+        engine.close()
+        copy.close()
+
+
+def test_hashlife_cache_is_collected_after_jump():
+    path = pathlib.Path(__file__).parent / "sir_robin.rle"
+    engine = HashLife(parse_rle(str(path)), max_nodes=500)
+    engine.step(256)
+    assert len(engine._nodes) <= 500
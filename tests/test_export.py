@@ -0,0 +1,66 @@
+""" LZW data of exported GIF frames decoded back to pixels. """
+
+import numpy as np
+import pytest
+
+from game_of_life.export import _gif_lzw
+
+
+def _lzw_decode(data: bytes) -> np.ndarray:
+    """ Plain GIF LZW decoder of sub-blocks with minimum code size 8. """
+
+    stream = bytearray()
+    start = 0
+    while data[start]:
+        stream += data[start + 1:start + 1 + data[start]]
+        start += 1 + data[start]
+    assert start == len(data) - 1
+
+    bits = int.from_bytes(stream, "little")
+    position = 0
+    pixels = bytearray()
+    table, previous, width = [], None, 9
+    while True:
+        code = bits >> position & ((1 << width) - 1)
+        position += width
+        if code == 256:
+            table = [bytes((c,)) for c in range(256)] + [b"", b""]
+            previous, width = None, 9
+            continue
+        if code == 257:
+            break
+
+        if previous is None:
+            entry = table[code]
+        else:
+            entry = table[code] if code < len(table) \
+                else previous + previous[:1]
+            table.append(previous + entry[:1])
+        pixels += entry
+        previous = entry
+        if len(table) == 1 << width and width < 12:
+            width += 1
+
+    return np.frombuffer(bytes(pixels), np.uint8)
+
+
+def _runs(lengths, colors) -> np.ndarray:
+    return np.repeat(np.array(colors, np.uint8), lengths)
+
+
+@pytest.mark.parametrize("pixels", (
+    np.zeros(1, np.uint8),
+    _runs((1, 2, 3, 300, 5000, 1), (0, 1, 0, 2, 1, 255)),
+    # Runs longer than 1M pixels are split, codes grow up to 11 bits.
+    _runs((3, (1 << 20) + 777, 40), (7, 0, 1)),
+    np.random.default_rng(0).integers(0, 4, 3000).astype(np.uint8),
+), ids=("single", "runs", "long_run", "noise"))
+def test_gif_lzw_decodes_to_pixels(pixels):
+    np.testing.assert_array_equal(_lzw_decode(_gif_lzw(pixels)), pixels)
+
+
+def test_gif_lzw_of_frame_is_row_major():
+    frame = np.arange(12, dtype=np.uint8).reshape(3, 4) % 3
+    np.testing.assert_array_equal(
+        _lzw_decode(_gif_lzw(frame)), frame.ravel()
+    )
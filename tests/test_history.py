@@ -0,0 +1,62 @@
+""" Round trips of states through History. """
+
+import pathlib
+
+import numpy as np
+import pytest
+
+from game_of_life import History, SparseCells, parse_rle_array
+from game_of_life.packed_state import state_to_keys
+
+PATTERN = pathlib.Path(__file__).parent / "p18_glider_shuttle.rle"
+
+
+def _states(count: int, every: int = 1) -> dict[int, np.ndarray]:
+    """ Keys of states of pattern at every recorded generation. """
+
+    cells = SparseCells(parse_rle_array(str(PATTERN)))
+    states = {}
+    for generation in range(0, count * every, every):
+        cells.step(generation - cells.generation)
+        states[generation] = state_to_keys(cells.live_cells())
+    return states
+
+
+@pytest.mark.parametrize("compress", (True, False))
+def test_seek_across_keyframes(compress):
+    states = _states(40, every=2)
+    history = History(keyframe_interval=8, compress=compress)
+    for generation, keys in states.items():
+        history.record(generation, keys)
+    history.record(10, states[10])
+
+    assert len(history) == 40
+    assert (history.first, history.last) == (0, 78)
+    for generation in range(-1, 81):
+        found = history.seek(generation)
+        if generation < 0:
+            assert found is None
+            continue
+        # Odd generations aren't recorded, so previous one is found.
+        expected = min(generation - generation % 2, 78)
+        assert found[0] == expected
+        np.testing.assert_array_equal(
+            state_to_keys(found[1]), states[expected]
+        )
+
+
+def test_budget_drops_oldest_segments():
+    states = _states(200)
+    history = History(budget=4096, keyframe_interval=16)
+    for generation, keys in states.items():
+        history.record(generation, keys)
+
+    assert history.nbytes <= 4096
+    assert history.first > 0
+    assert history.seek(history.first - 1) is None
+    for generation in (history.first, history.first + 5, 199):
+        found = history.seek(generation)
+        assert found[0] == generation
+        np.testing.assert_array_equal(
+            state_to_keys(found[1]), states[generation]
+        )
@@ -0,0 +1,71 @@
+""" Slot reuse, compaction and dirty ranges of InstanceBuffer. """
+
+import numpy as np
+
+from game_of_life.instance_buffer import InstanceBuffer, _to_ranges
+
+
+def _alive(buffer: InstanceBuffer) -> set:
+    offsets = buffer.offsets[:buffer.count].astype(np.int64)
+    return set(map(tuple, offsets.tolist()))
+
+
+def test_to_ranges_merges_slots():
+    slots = np.array([7, 3, 4, 4, 10, 5, 8, 0])
+    assert _to_ranges(slots) == [(0, 1), (3, 6), (7, 9), (10, 11)]
+    assert _to_ranges(np.empty(0, np.int64)) == []
+
+
+def test_dead_cell_is_replaced_by_last_one():
+    buffer = InstanceBuffer()
+    state = {(x, 0) for x in range(6)}
+    assert buffer.update(state) == [(0, 6)]
+
+    slot = buffer.offsets[:buffer.count].tolist().index([2.0, 0.0])
+    last = buffer.offsets[buffer.count - 1].tolist()
+    state.remove((2, 0))
+    assert buffer.update(state) == [(slot, slot + 1)]
+    assert buffer.count == 5
+    assert buffer.offsets[slot].tolist() == last
+    assert _alive(buffer) == state
+
+
+def test_births_reuse_slots_of_deaths():
+    buffer = InstanceBuffer(capacity=4)
+    buffer.update({(0, 0), (1, 0), (2, 0), (3, 0)})
+    ranges = buffer.update({(0, 0), (1, 0), (5, 5), (6, 6)})
+    assert buffer.capacity == 4
+    assert buffer.count == 4
+    assert ranges == [(2, 4)]
+    assert _alive(buffer) == {(0, 0), (1, 0), (5, 5), (6, 6)}
+
+
+def test_growth_keeps_offsets():
+    buffer = InstanceBuffer(capacity=2)
+    buffer.update({(0, 0), (1, 1)})
+    state = {(x, -x) for x in range(10)}
+    buffer.update(state)
+    assert buffer.capacity >= 10
+    assert _alive(buffer) == state
+
+
+def test_random_updates_stay_compact():
+    rng = np.random.default_rng(0)
+    buffer = InstanceBuffer(capacity=8)
+    for _ in range(50):
+        before = buffer.offsets[:buffer.count].copy()
+        coords = rng.integers(-8, 8, (rng.integers(0, 120), 2))
+        state = set(map(tuple, coords.tolist()))
+        ranges = buffer.update(state)
+
+        assert buffer.count == len(state)
+        assert _alive(buffer) == state
+
+        # Every slot that changed is inside dirty ranges.
+        dirty = np.zeros(buffer.count, bool)
+        for start, end in ranges:
+            dirty[start:end] = True
+        common = min(len(before), buffer.count)
+        changed = (before[:common] != buffer.offsets[:common]).any(axis=1)
+        assert not (changed & ~dirty[:common]).any()
+        assert dirty[common:].all()
@@ -0,0 +1,65 @@
+""" Parsing of rules in headers of RLE files and of cells data
+    by chunks.
+"""
+
+import numpy as np
+import pytest
+
+from game_of_life import (
+    CONWAY, Rule, parse_rle, parse_rle_array, parse_rle_rule, write_rle,
+)
+
+
+def test_topology_suffix_is_ignored():
+    src = "x = 3, y = 1, rule = B36/S23:P10,10\n3o!"
+    assert parse_rle_rule(src) == Rule.parse("B36/S23")
+    assert parse_rle(src) == {(0, 0), (1, 0), (2, 0)}
+
+
+def test_unsupported_rule_falls_back_to_conway():
+    src = "x = 3, y = 1, rule = Life\n3o!"
+    with pytest.warns(UserWarning):
+        assert parse_rle_rule(src) == CONWAY
+    assert parse_rle(src) == {(0, 0), (1, 0), (2, 0)}
+
+
+def _cells(cells: np.ndarray) -> set:
+    return set(map(tuple, cells.tolist()))
+
+
+@pytest.mark.parametrize("chunk_size", (1, 2, 3, 1 << 16))
+def test_runs_split_across_chunks(chunk_size):
+    src = "x = 12, y = 3\n12o$3b2o10$o!"
+    cells = parse_rle_array(src, chunk_size=chunk_size)
+    assert _cells(cells) == {
+        *((x, 0) for x in range(12)), (3, -1), (4, -1), (0, -11),
+    }
+
+
+def test_multi_digit_line_skips():
+    src = "x = 2, y = 124\no12$bo110$o!"
+    assert _cells(parse_rle_array(src, chunk_size=2)) == {
+        (0, 0), (1, -12), (0, -122),
+    }
+
+
+def test_missing_end_mark():
+    src = "x = 3, y = 2\n3o$o"
+    assert _cells(parse_rle_array(src)) == {(0, 0), (1, 0), (2, 0), (0, -1)}
+    assert _cells(parse_rle_array(src, chunk_size=1)) == \
+        {(0, 0), (1, 0), (2, 0), (0, -1)}
+
+
+def test_written_cells_are_parsed_back(tmp_path):
+    rng = np.random.default_rng(0)
+    ys, xs = np.nonzero(rng.random((40, 150)) < 0.4)
+    cells = np.stack((xs - 70, 5 - ys), axis=1)
+    path = str(tmp_path / "soup.rle")
+
+    write_rle(path, cells, Rule.parse("B36/S23"))
+
+    # Pattern is parsed back with its top left corner at (0, 0).
+    corner = (cells[:, 0].min(), cells[:, 1].max())
+    assert parse_rle_rule(path) == Rule.parse("B36/S23")
+    assert _cells(parse_rle_array(path, chunk_size=7)) == \
+        _cells(cells - corner)